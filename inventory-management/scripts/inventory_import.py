@@ -4,34 +4,82 @@ Inventory Batch Import Script
 
 This script facilitates the bulk import of vehicle inventory data from CSV files.
 It validates the data, transforms it to match the API requirements, and performs
-batch imports via the inventory management API.
+batch imports via the inventory management API. Feeds may also be gzip-compressed
+CSV, JSON Lines (optionally gzip-compressed) or Parquet; all formats are streamed.
 
 Usage:
     python inventory_import.py --file INPUT_FILE.csv [--api-url API_URL] [--dry-run]
+                               [--workers N] [--max-in-flight N]
+                               [--rate-limit RPS] [--burst N] [--max-retries N]
+                               [--pool-size N] [--timeout SECONDS]
+                               [--mode {row,bulk}] [--chunk-size N] [--bulk-template NAME]
+                               [--bulk-timeout SECONDS]
+                               [--checkpoint FILE] [--resume] [--delta-index FILE]
+                               [--format {auto,csv,jsonl,parquet}] [--engine {thread,async}]
+                               [--progress] [--progress-interval SECONDS] [--log-every N]
+                               [--metrics-file METRICS.json]
+    python inventory_import.py --file INPUT_FILE.csv --validate-only [--report REPORT.json]
+                               [--processes N]
+
+Both forms also accept [--log-file FILE].
+
+Bulk mode (--mode bulk) creates vehicles through the inventory CSV import
+endpoint, whose Standard template only has these columns:
+
+    Feed column      Template column   Vehicle field
+    vin              VIN               VIN
+    stock_number     Stock             StockNumber
+    make             Make              Make
+    model            Model             Model
+    year             Year              Year
+    trim             Trim              Trim
+    exterior_color   Ext Color         ExteriorColor
+    interior_color   Int Color         InteriorColor
+    mileage          Mileage           Mileage
+    status           Status            Status
+    list_price       List Price        ListPrice
+    msrp             MSRP              MSRP
+
+The other feed columns (body_style, engine, transmission, drivetrain,
+fuel_type, invoice_price, internet_price, description and features) cannot
+be sent that way, so vehicles created in bulk mode are stored without them
+and a warning names the columns at the start of the import. Use row mode
+to import them.
 """
 
+from __future__ import annotations
+
 import argparse
+import contextlib
 import csv
+import functools
+import gzip
+import hashlib
+import io
 import json
 import logging
 import os
+import queue
+import random
+import re
 import sys
+import threading
 import time
 import traceback
-from datetime import datetime
-from typing import Dict, List, Optional, Any
-
-import requests
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(f"inventory_import_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Any, Tuple
+
+# requests, pyarrow (Parquet feeds) and aiohttp (asyncio engine) are imported
+# where they are used, so --help, --validate-only workers and library use
+# don't pay for them
+if TYPE_CHECKING:
+    import asyncio
+    import requests
+
+# Logging is configured by main(); importing the module has no side effects
 logger = logging.getLogger("inventory_import")
 
 # Default API URL - should be configurable
@@ -68,9 +116,575 @@ REQUIRED_FIELDS = ["stock_number", "vin", "year", "make", "model"]
 # Numeric fields that need type conversion
 NUMERIC_FIELDS = ["year", "mileage", "msrp", "invoice_price", "list_price", "internet_price"]
 
+# Numeric fields holding currency amounts, which may contain "$" and thousands separators
+CURRENCY_FIELDS = frozenset(["msrp", "invoice_price", "list_price", "internet_price"])
+
+# Default request rate against the API (requests per second, 0 = unlimited)
+DEFAULT_RATE_LIMIT = 10.0
+
+# Default number of retries for a failed API call
+DEFAULT_MAX_RETRIES = 3
+
+# Default timeout for a single API call in seconds
+DEFAULT_TIMEOUT = 30.0
+
+# Default timeout for a bulk import call, which saves a whole chunk of rows
+DEFAULT_BULK_TIMEOUT = 300.0
+
+# Minimum number of pooled keep-alive connections to the API
+DEFAULT_POOL_SIZE = 10
+
+# Rows per request in bulk mode
+DEFAULT_CHUNK_SIZE = 500
+
+# Mapping template used by the inventory CSV import endpoint in bulk mode
+DEFAULT_BULK_TEMPLATE = "Standard"
+
+# Column layout of the bulk template, keyed by API model field (see the
+# module docstring). Fields missing here are not sent in bulk mode; in
+# particular invoicePrice is not "Cost", which the endpoint stores as the
+# vehicle's acquisition cost.
+BULK_TEMPLATE_COLUMNS = {
+    "vin": "VIN",
+    "stockNumber": "Stock",
+    "make": "Make",
+    "model": "Model",
+    "year": "Year",
+    "trim": "Trim",
+    "exteriorColor": "Ext Color",
+    "interiorColor": "Int Color",
+    "mileage": "Mileage",
+    "status": "Status",
+    "listPrice": "List Price",
+    "msrp": "MSRP"
+}
+
+# Feed formats understood by the importer
+FEED_FORMATS = ["csv", "jsonl", "parquet"]
+
+# Rows handed from the reader thread to the importer at a time, and how many
+# such batches may be buffered ahead of the importer
+PREFETCH_BATCH_ROWS = 500
+PREFETCH_DEPTH = 8
+
+# Requests kept in flight by the asyncio engine unless --max-in-flight is given
+DEFAULT_ASYNC_CONCURRENCY = 100
+
+# Rows per chunk handed to a validation process
+VALIDATION_CHUNK_ROWS = 5000
+
+# Oldest model year accepted by validation
+MIN_MODEL_YEAR = 1900
+
+# VIN check digit (ISO 3779 / 49 CFR 565) transliteration values and position weights
+VIN_TRANSLITERATION = {
+    **{str(digit): digit for digit in range(10)},
+    "A": 1, "B": 2, "C": 3, "D": 4, "E": 5, "F": 6, "G": 7, "H": 8,
+    "J": 1, "K": 2, "L": 3, "M": 4, "N": 5, "P": 7, "R": 9,
+    "S": 2, "T": 3, "U": 4, "V": 5, "W": 6, "X": 7, "Y": 8, "Z": 9
+}
+VIN_WEIGHTS = [8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2]
+
+# Rows recorded in the checkpoint journal before it is written to disk
+CHECKPOINT_FLUSH_ROWS = 100
+
+# Maximum seconds between checkpoint journal writes
+CHECKPOINT_FLUSH_SECONDS = 5.0
+
+# Per-row error message returned by the CSV import endpoint
+BULK_ROW_ERROR_PATTERN = re.compile(r"Error in row (\d+):")
+
+# Import result for rows skipped because the delta index shows no change
+UNCHANGED = {"unchanged": True}
+
+# Status codes that are worth retrying, and the subset that signal the API is overloaded
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+THROTTLE_STATUS_CODES = {429, 503}
+
+# Upper bounds (seconds) of the request latency histogram in the metrics file
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+# Seconds between progress line updates
+DEFAULT_PROGRESS_INTERVAL = 2.0
+
+
+class RateLimiter:
+    """Thread-safe token bucket that adapts its rate to API back-pressure
+
+    Tokens refill at ``rate`` per second up to ``burst``. When the API answers
+    429/503 the rate is halved (never below ``min_rate``) and, if a Retry-After
+    was given, the bucket is paused until then. Each success raises the rate
+    again by a small step until the configured rate is reached.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, min_rate: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or max(rate / 20, 0.1)
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait_time = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait_time, self._paused_until - now)
+
+    def acquire(self) -> None:
+        """Block until a request may be sent"""
+        wait_time = self.reserve()
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    def backoff(self, retry_after: Optional[float] = None) -> None:
+        """Slow down after the API signalled it is overloaded"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        logger.warning(f"API is throttling requests - rate lowered to {self.rate:.2f}/s")
+
+    def recover(self) -> None:
+        """Speed back up towards the configured rate after a successful request"""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class RetryPolicy:
+    """Retry settings with jittered exponential backoff"""
+
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number ``attempt`` (0-based)"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # "Full jitter" keeps concurrent workers from retrying in lock-step
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class RequestMetrics:
+    """Thread-safe record of API request latencies and response status codes"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.status_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, status: Optional[int] = None) -> None:
+        """Record one request attempt; ``status`` is None when no response came back"""
+        code = str(status) if status is not None else "error"
+        with self._lock:
+            self.latencies.append(seconds)
+            self.status_counts[code] = self.status_counts.get(code, 0) + 1
+
+    def percentiles(self, *percents: float) -> List[Optional[float]]:
+        """Nearest-rank latency percentiles in seconds (None before any request)"""
+        with self._lock:
+            ordered = sorted(self.latencies)
+        if not ordered:
+            return [None] * len(percents)
+        return [ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+                for pct in percents]
+
+    def histogram(self, buckets: List[float] = LATENCY_BUCKETS) -> List[Dict[str, Any]]:
+        """Cumulative latency histogram, Prometheus style: requests taking at most ``le`` seconds"""
+        with self._lock:
+            latencies = list(self.latencies)
+        counts = [0] * len(buckets)
+        for seconds in latencies:
+            for i, bound in enumerate(buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+                    break
+        histogram = []
+        cumulative = 0
+        for bound, count in zip(buckets, counts):
+            cumulative += count
+            histogram.append({"le": bound, "count": cumulative})
+        histogram.append({"le": "+Inf", "count": len(latencies)})
+        return histogram
+
+    def summary(self) -> Dict[str, Any]:
+        """Request counts, latency percentiles and histogram for the metrics file"""
+        p50, p95, p99 = self.percentiles(50, 95, 99)
+        with self._lock:
+            count = len(self.latencies)
+            total = sum(self.latencies)
+            slowest = max(self.latencies, default=None)
+            status_counts = dict(sorted(self.status_counts.items()))
+        return {
+            "count": count,
+            "status_codes": status_counts,
+            "latency_seconds": {"p50": p50, "p95": p95, "p99": p99, "max": slowest, "sum": total},
+            "latency_histogram": self.histogram()
+        }
+
+
+class ProgressReporter:
+    """Background progress line: rows/s, error rate and ETA of a running import
+
+    The import only updates its statistics dict; a daemon thread samples it
+    every ``interval`` seconds, so progress costs nothing per row. On a
+    terminal the line is redrawn in place on stderr, otherwise it is logged.
+    The ETA comes from the share of the input file read so far, or from the
+    row count when the feed knows it up front (Parquet).
+    """
+
+    def __init__(self, interval: float = DEFAULT_PROGRESS_INTERVAL, stream: Any = None):
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.total_rows: Optional[int] = None
+        self._feed = None
+        self._feed_size = 0
+        self._stats: Optional[Dict[str, int]] = None
+        self._start = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._interactive = hasattr(self.stream, "isatty") and self.stream.isatty()
+
+    def follow_file(self, feed: Any, size: int) -> None:
+        """Estimate progress from the read position of the binary ``feed`` handle"""
+        self._feed = feed
+        self._feed_size = size
+
+    def start(self, stats: Dict[str, int]) -> None:
+        self._stats = stats
+        self._start = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._report()
+        if self._interactive:
+            self.stream.write("\n")
+            self.stream.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._report()
+
+    def _fraction(self) -> Optional[float]:
+        if self.total_rows:
+            return min(1.0, self._stats["total"] / self.total_rows)
+        if self._feed is not None and self._feed_size:
+            try:
+                return min(1.0, self._feed.tell() / self._feed_size)
+            except (OSError, ValueError):
+                # The feed was closed under us at the end of the run
+                return 1.0
+        return None
+
+    def line(self) -> str:
+        stats = self._stats
+        elapsed = time.monotonic() - self._start
+        done = stats["total"]
+        finished = done - stats["skipped"]
+        rate = done / elapsed if elapsed else 0.0
+        error_rate = stats["error"] / finished * 100 if finished else 0.0
+        fraction = self._fraction()
+        if fraction:
+            eta = f"{elapsed * (1 - fraction) / fraction:.0f}s"
+            position = f" ({fraction * 100:.1f}%)"
+        else:
+            eta, position = "?", ""
+        return (f"{done} rows{position} | {rate:.1f} rows/s | ok {stats['success']} "
+                f"err {stats['error']} ({error_rate:.1f}%) skip {stats['skipped']} | ETA {eta}")
+
+    def _report(self) -> None:
+        if self._stats is None:
+            return
+        line = self.line()
+        if self._interactive:
+            self.stream.write(f"\r{line}\033[K")
+            self.stream.flush()
+        else:
+            logger.info(f"Progress: {line}")
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class CheckpointJournal:
+    """Append-only journal of rows that the API has already committed
+
+    Each line holds a row key (stock number, or VIN when there is none) and
+    the ID the API returned for it. Entries are buffered and written every
+    ``flush_rows`` rows or ``flush_seconds`` seconds, whichever comes first,
+    so journaling does not add a disk sync per row. A run that is killed
+    outright may lose the last unflushed batch; those rows are simply sent
+    again on resume.
+    """
+
+    def __init__(self, path: str, resume: bool = False, flush_rows: int = CHECKPOINT_FLUSH_ROWS,
+                 flush_seconds: float = CHECKPOINT_FLUSH_SECONDS):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.completed = self._load(path) if resume else set()
+        self._buffer: List[str] = []
+        self._last_flush = time.monotonic()
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    @staticmethod
+    def _load(path: str) -> set:
+        """Read the keys of completed rows, ignoring a torn final line"""
+        completed = set()
+        try:
+            with open(path, 'r', encoding='utf-8') as journal:
+                for line in journal:
+                    if line.endswith("\n"):
+                        completed.add(line.split("\t", 1)[0])
+        except FileNotFoundError:
+            logger.warning(f"Checkpoint file not found, starting from the beginning: {path}")
+        return completed
+
+    def __contains__(self, key: Optional[str]) -> bool:
+        return key in self.completed
+
+    def record(self, key: Optional[str], vehicle_id: Any = None) -> None:
+        """Mark a row as committed"""
+        if not key:
+            return
+        self.completed.add(key)
+        self._buffer.append(f"{key}\t{vehicle_id or ''}\n")
+        if len(self._buffer) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered entries to disk"""
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._buffer.clear()
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+    def __enter__(self) -> "CheckpointJournal":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
 
-def validate_csv_headers(headers: List[str]) -> bool:
+
+class DeltaIndex:
+    """Local index of the payload last imported for each VIN
+
+    Maps VIN to a hash of the transformed payload and the vehicle ID the API
+    assigned, so rows that have not changed since the previous run can be
+    skipped and changed rows can be sent as updates. Workers update the index
+    concurrently; :meth:`save` replaces the file atomically.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as index_file:
+                self.entries = json.load(index_file)
+        except FileNotFoundError:
+            logger.info(f"Delta index not found, all rows will be imported: {path}")
+
+    @staticmethod
+    def payload_hash(vehicle_data: Dict[str, Any]) -> str:
+        """Stable hash of a transformed vehicle payload"""
+        canonical = json.dumps(vehicle_data, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, vin: Optional[str]) -> Optional[Dict[str, Any]]:
+        return self.entries.get(vin) if vin else None
+
+    def update(self, vin: Optional[str], digest: str, vehicle_id: Any) -> None:
+        # Without an ID a later change could not be sent as an update
+        if vin and vehicle_id:
+            with self._lock:
+                self.entries[vin] = {"hash": digest, "id": vehicle_id}
+
+    def save(self) -> None:
+        """Write the index to disk, replacing the previous version atomically"""
+        with self._lock:
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as index_file:
+                json.dump(self.entries, index_file, separators=(",", ":"))
+            os.replace(temp_path, self.path)
+
+
+def row_key(row: Dict[str, str]) -> Optional[str]:
+    """Key identifying a row across runs: its stock number, or its VIN if it has none"""
+    return str(row.get("stock_number") or "").strip() or str(row.get("vin") or "").strip() or None
+
+
+def detect_format(file_path: str) -> str:
+    """Guess a feed's format from its name, falling back to its first bytes"""
+    name = file_path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    if name.endswith(".parquet"):
+        return "parquet"
+    if name.endswith((".csv", ".txt")):
+        return "csv"
+    
+    with open(file_path, 'rb') as feed:
+        magic = feed.read(4)
+    if magic == b"PAR1":
+        return "parquet"
+    opener = gzip.open if magic[:2] == b"\x1f\x8b" else open
+    with opener(file_path, 'rb') as feed:
+        return "jsonl" if feed.read(64).lstrip().startswith(b"{") else "csv"
+
+
+def _open_text(file_path: str):
+    """Open a text feed, decompressing it on the fly if it is gzipped"""
+    with open(file_path, 'rb') as feed:
+        compressed = feed.read(2) == b"\x1f\x8b"
+    if compressed:
+        return gzip.open(file_path, 'rt', encoding='utf-8-sig', newline='')
+    return open(file_path, 'r', encoding='utf-8-sig', newline='')
+
+
+def _jsonl_rows(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _parquet_rows(parquet_file: Any) -> Iterator[Dict[str, Any]]:
+    for batch in parquet_file.iter_batches(batch_size=PREFETCH_BATCH_ROWS):
+        yield from batch.to_pylist()
+
+
+@contextlib.contextmanager
+def open_feed(file_path: str, file_format: str = "auto", progress: Optional[ProgressReporter] = None):
+    """Open a vehicle feed and yield (field names, iterator of row dicts)
+
+    Rows are read lazily, so memory use does not depend on the file size.
+    For JSON Lines the field names come from the first record; for Parquet
+    they come from the file schema. A ``progress`` reporter is told how to
+    measure how far through the file the reader is.
+    """
+    if file_format == "auto":
+        file_format = detect_format(file_path)
+    
+    if file_format == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is required for Parquet feeds. Please install it with: pip install pyarrow") from None
+        parquet_file = pq.ParquetFile(file_path)
+        if progress is not None:
+            progress.total_rows = parquet_file.metadata.num_rows
+        yield parquet_file.schema_arrow.names, _parquet_rows(parquet_file)
+        return
+    
+    with _open_text(file_path) as feed:
+        if progress is not None:
+            # Compressed feeds are measured by the compressed bytes consumed
+            progress.follow_file(getattr(feed.buffer, "fileobj", feed.buffer), os.path.getsize(file_path))
+        if file_format == "jsonl":
+            rows = _jsonl_rows(feed)
+            first = next(rows, None)
+            if first is None:
+                yield [], iter(())
+            else:
+                yield list(first), _prepend(first, rows)
+        else:
+            reader = csv.DictReader(feed)
+            yield reader.fieldnames, reader
+
+
+def _prepend(first: Any, rest: Iterator[Any]) -> Iterator[Any]:
+    yield first
+    yield from rest
+
+
+def _prefetch(rows: Iterable[Dict[str, Any]], batch_rows: int = PREFETCH_BATCH_ROWS,
+              depth: int = PREFETCH_DEPTH) -> Iterator[Dict[str, Any]]:
+    """Read rows on a background thread so decompression and parsing overlap with submission
+
+    At most ``depth`` batches of ``batch_rows`` rows are buffered. Errors
+    raised while reading are re-raised in the consuming thread.
+    """
+    buffer: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    finished = object()
+    
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce() -> None:
+        try:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_rows:
+                    if not put(batch):
+                        return
+                    batch = []
+            if batch and not put(batch):
+                return
+            put(finished)
+        except BaseException as e:
+            put(e)
+    
+    reader_thread = threading.Thread(target=produce, name="feed-reader", daemon=True)
+    reader_thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is finished:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield from item
+    finally:
+        stop.set()
+        reader_thread.join()
+
+
+def validate_csv_headers(headers: Optional[List[str]]) -> bool:
     """Validate that the CSV contains the required headers"""
+    headers = headers or []
     for field in REQUIRED_FIELDS:
         if field not in headers:
             logger.error(f"Missing required field: {field}")
@@ -78,127 +692,1138 @@ def validate_csv_headers(headers: List[str]) -> bool:
     return True
 
 
+def _parse_currency(value: Any) -> float:
+    if not isinstance(value, str):
+        # Already numeric (JSON Lines / Parquet feeds)
+        return float(value)
+    # Remove currency symbols and commas (chained replace beats str.translate here)
+    return float(value.replace("$", "").replace(",", ""))
+
+
+def _parse_features(value: Any) -> Any:
+    # Parse features if they're in comma-separated format
+    if isinstance(value, str) and "," in value:
+        return [{"name": feature.strip()} for feature in value.split(",")]
+    # JSON Lines / Parquet feeds may already carry a list of names
+    if isinstance(value, list) and value and isinstance(value[0], str):
+        return [{"name": feature.strip()} for feature in value]
+    return value
+
+
+class RowTransformer:
+    """Row transformer compiled once for a CSV header
+
+    Works out up front which mapped columns the file has and which converter
+    each one needs, so transforming a row is a copy of the plain columns plus
+    one parse per numeric column, with no lookups in FIELD_MAPPINGS or
+    NUMERIC_FIELDS.
+    """
+
+    def __init__(self, headers: Iterable[str]):
+        headers = set(headers or [])
+        self.plain_columns: List[Tuple[str, str]] = []
+        self.numeric_columns: List[Tuple[str, str, Any]] = []
+        self.features_column: Optional[str] = None
+        for csv_field, api_field in FIELD_MAPPINGS.items():
+            if csv_field not in headers:
+                continue
+            if csv_field in CURRENCY_FIELDS:
+                self.numeric_columns.append((csv_field, api_field, _parse_currency))
+            elif csv_field in NUMERIC_FIELDS:
+                self.numeric_columns.append((csv_field, api_field, int))
+            elif csv_field == "features":
+                self.features_column = csv_field
+            else:
+                self.plain_columns.append((csv_field, api_field))
+
+    def transform(self, row: Dict[str, str]) -> Dict[str, Any]:
+        """Transform a row from CSV format to API model format"""
+        get = row.get
+        transformed = {api_field: get(csv_field) for csv_field, api_field in self.plain_columns}
+        
+        for csv_field, api_field, parse in self.numeric_columns:
+            value = get(csv_field)
+            if value:
+                try:
+                    value = parse(value)
+                except ValueError:
+                    logger.warning(f"Could not convert {csv_field} to number: {value}")
+            transformed[api_field] = value
+        
+        if self.features_column:
+            transformed[FIELD_MAPPINGS[self.features_column]] = _parse_features(get(self.features_column))
+        
+        return transformed
+
+
+@functools.lru_cache(maxsize=16)
+def _transformer_for(headers: Tuple[str, ...]) -> RowTransformer:
+    return RowTransformer(headers)
+
+
 def transform_row(row: Dict[str, str]) -> Dict[str, Any]:
-    """Transform a row from CSV format to API model format"""
-    transformed = {}
-    
-    # Map fields according to FIELD_MAPPINGS
-    for csv_field, api_field in FIELD_MAPPINGS.items():
-        if csv_field in row:
-            transformed[api_field] = row[csv_field]
+    """Transform a row from CSV format to API model format
+
+    Convenience wrapper for single rows; bulk callers should build one
+    :class:`RowTransformer` for the file header and reuse it.
+    """
+    return _transformer_for(tuple(row)).transform(row)
+
+
+def vin_error(vin: str) -> Optional[Tuple[str, str]]:
+    """Check a VIN's length, characters and check digit, returning (code, message) if invalid"""
+    if len(vin) != 17:
+        return "vin_length", f"VIN must be 17 characters, got {len(vin)}"
+    try:
+        total = sum(VIN_TRANSLITERATION[char] * weight for char, weight in zip(vin, VIN_WEIGHTS))
+    except KeyError as e:
+        return "vin_characters", f"VIN contains invalid character {e.args[0]!r}"
+    remainder = total % 11
+    expected = "X" if remainder == 10 else str(remainder)
+    if vin[8] != expected:
+        return "vin_check_digit", f"VIN check digit is {vin[8]!r}, expected {expected!r}"
+    return None
+
+
+def validate_row(row: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    """Check one row's required fields, types and VIN, returning (field, code, message) per problem"""
+    problems = []
+    for field in REQUIRED_FIELDS:
+        if row.get(field) in (None, ""):
+            problems.append((field, "required", f"{field} is required"))
     
-    # Convert numeric fields
     for field in NUMERIC_FIELDS:
-        api_field = FIELD_MAPPINGS.get(field)
-        if api_field in transformed and transformed[api_field]:
-            try:
-                if field in ["msrp", "invoice_price", "list_price", "internet_price"]:
-                    # Remove currency symbols and commas
-                    value = transformed[api_field].replace("$", "").replace(",", "")
-                    transformed[api_field] = float(value)
-                else:
-                    transformed[api_field] = int(transformed[api_field])
-            except ValueError:
-                logger.warning(f"Could not convert {field} to number: {transformed[api_field]}")
+        value = row.get(field)
+        if value in (None, ""):
+            continue
+        try:
+            number = _parse_currency(value) if field in CURRENCY_FIELDS else int(value)
+        except (TypeError, ValueError):
+            problems.append((field, "not_numeric", f"{field} is not a number: {value!r}"))
+            continue
+        if number < 0:
+            problems.append((field, "negative", f"{field} must not be negative: {value!r}"))
+        elif field == "year" and not MIN_MODEL_YEAR <= number <= datetime.now().year + 2:
+            problems.append((field, "out_of_range", f"year is out of range: {value!r}"))
     
-    # Parse features if they're in comma-separated format
-    if "features" in transformed:
+    vin = str(row.get("vin") or "").strip().upper()
+    if vin:
+        error = vin_error(vin)
+        if error:
+            problems.append(("vin", *error))
+    return problems
+
+
+def _validate_chunk(chunk: List[Tuple[int, Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], List[Tuple[int, str, str]]]:
+    """Validate a chunk of rows in a worker process
+
+    Returns the row errors plus (row number, stock number, VIN) for every row,
+    from which the parent process finds duplicates across chunks.
+    """
+    errors = []
+    keys = []
+    for row_number, row in chunk:
+        stock_number = str(row.get("stock_number") or "").strip()
+        vin = str(row.get("vin") or "").strip().upper()
+        keys.append((row_number, stock_number, vin))
+        for field, code, message in validate_row(row):
+            errors.append({"row": row_number, "key": stock_number or vin or None, "field": field,
+                           "code": code, "message": message})
+    return errors, keys
+
+
+def validate_file(file_path: str, report_path: str, file_format: str = "auto",
+                  processes: Optional[int] = None,
+                  chunk_rows: int = VALIDATION_CHUNK_ROWS) -> Dict[str, Any]:
+    """Pre-flight check of a whole feed without calling the API
+
+    Rows are validated in chunks across ``processes`` worker processes
+    (default: one per CPU). Duplicate stock numbers and VINs are found across
+    the whole file. A JSON report listing every problem is written to
+    ``report_path`` and its summary is returned. The workers are spawned
+    rather than forked, since the feed is read on a prefetch thread meanwhile
+    and forking a process with threads can leave a child deadlocked.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    
+    errors: List[Dict[str, Any]] = []
+    total_rows = 0
+    first_seen: Dict[Tuple[str, str], int] = {}
+    processes = processes or os.cpu_count() or 1
+    
+    def collect(chunk_errors, keys):
+        nonlocal total_rows
+        errors.extend(chunk_errors)
+        total_rows += len(keys)
+        for row_number, stock_number, vin in keys:
+            for field, value in (("stock_number", stock_number), ("vin", vin)):
+                if not value:
+                    continue
+                first_row = first_seen.setdefault((field, value), row_number)
+                if first_row != row_number:
+                    errors.append({"row": row_number, "key": stock_number or vin, "field": field,
+                                   "code": "duplicate", "message": f"{field} {value} already used in row {first_row}"})
+    
+    with open_feed(file_path, file_format) as (fieldnames, rows):
+        missing = [field for field in REQUIRED_FIELDS if field not in (fieldnames or [])]
+        if missing:
+            errors.extend({"row": None, "key": None, "field": field, "code": "missing_column",
+                           "message": f"Missing required field: {field}"} for field in missing)
+        else:
+            with ProcessPoolExecutor(max_workers=processes,
+                                     mp_context=multiprocessing.get_context('spawn')) as executor, \
+                    contextlib.closing(_prefetch(rows)) as reader:
+                # Submit in order but keep only a few chunks per process in memory
+                pending = []
+                for chunk in _chunked(enumerate(reader, start=1), chunk_rows):
+                    pending.append(executor.submit(_validate_chunk, chunk))
+                    if len(pending) >= processes * 2:
+                        collect(*pending.pop(0).result())
+                for future in pending:
+                    collect(*future.result())
+    
+    errors.sort(key=lambda error: (error["row"] or 0, error["field"]))
+    invalid_rows = len({error["row"] for error in errors if error["row"] is not None})
+    errors_by_code: Dict[str, int] = {}
+    for error in errors:
+        errors_by_code[error["code"]] = errors_by_code.get(error["code"], 0) + 1
+    
+    summary = {
+        "file": file_path,
+        "validated_at": datetime.now(timezone.utc).isoformat(),
+        "total_rows": total_rows,
+        "invalid_rows": invalid_rows,
+        "valid": not errors,
+        "errors_by_code": errors_by_code
+    }
+    with open(report_path, 'w', encoding='utf-8') as report:
+        json.dump({**summary, "errors": errors}, report, indent=2)
+    return summary
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Create an HTTP session that keeps up to ``pool_size`` connections alive per host"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    session = requests.Session()
+    # pool_block makes extra threads wait for a free connection instead of
+    # opening (and then discarding) throwaway connections
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+
+def _request_not_sent(error: Exception) -> bool:
+    """Whether a failed request never reached the API, because no connection could be made"""
+    import requests
+    from urllib3.exceptions import NewConnectionError
+    
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    # Refused connections and failed name lookups arrive wrapped in urllib3's MaxRetryError
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _send_with_retry(method: str, url: str, label: str, rate_limiter: Optional[RateLimiter] = None,
+                     retry_policy: Optional[RetryPolicy] = None,
+                     session: Optional[requests.Session] = None,
+                     timeout: Optional[float] = DEFAULT_TIMEOUT,
+                     metrics: Optional[RequestMetrics] = None,
+                     idempotent: bool = True,
+                     **request_kwargs: Any) -> Optional[requests.Response]:
+    """Call the API, retrying connection errors and retryable status codes
+
+    Returns the successful response, or None once ``retry_policy`` gives up.
+    ``label`` identifies the request in log messages.
+
+    A request that is not ``idempotent`` is only retried when the API cannot
+    have acted on it: the connection was never established, or the API
+    answered 429/503 to turn it away. After a read timeout or another server
+    error it may already have been committed, so it is not sent again.
+    """
+    import requests
+    
+    retry_policy = retry_policy or RetryPolicy()
+    http = session or requests
+    
+    for attempt in range(retry_policy.max_retries + 1):
+        retries_left = attempt < retry_policy.max_retries
+        if rate_limiter:
+            rate_limiter.acquire()
+        
+        start = time.perf_counter()
+        status = None
         try:
-            if isinstance(transformed["features"], str) and "," in transformed["features"]:
-                transformed["features"] = [
-                    {"name": feature.strip()} for feature in transformed["features"].split(",")
-                ]
+            response = http.request(method, url, timeout=timeout, **request_kwargs)
+            status = response.status_code
+        except requests.RequestException as e:
+            if retries_left and (idempotent or _request_not_sent(e)):
+                delay = retry_policy.delay(attempt)
+                logger.warning(f"Request for {label} failed ({e}) - retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            if not idempotent and not _request_not_sent(e):
+                logger.error(f"Request for {label} failed ({e}) and is not retried, "
+                             f"as the API may already have committed it")
+                return None
+            logger.error(f"Exception during API call: {e}")
+            return None
         except Exception as e:
-            logger.warning(f"Error parsing features: {e}")
+            logger.error(f"Exception during API call: {e}")
+            return None
+        
+        finally:
+            if metrics is not None:
+                metrics.record(time.perf_counter() - start, status)
+        
+        if response.status_code in [200, 201, 204]:
+            if rate_limiter:
+                rate_limiter.recover()
+            return response
+        
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if rate_limiter and response.status_code in THROTTLE_STATUS_CODES:
+            rate_limiter.backoff(retry_after)
+        
+        retryable = RETRYABLE_STATUS_CODES if idempotent else THROTTLE_STATUS_CODES
+        if response.status_code in retryable and retries_left:
+            delay = retry_policy.delay(attempt, retry_after)
+            logger.warning(f"API error ({response.status_code}) for {label} - retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        
+        logger.error(f"API error ({response.status_code}): {response.text}")
+        return None
     
-    return transformed
+    return None
+
 
+def import_vehicle(vehicle_data: Dict[str, Any], api_url: str, dry_run: bool,
+                   rate_limiter: Optional[RateLimiter] = None,
+                   retry_policy: Optional[RetryPolicy] = None,
+                   session: Optional[requests.Session] = None,
+                   timeout: Optional[float] = DEFAULT_TIMEOUT,
+                   metrics: Optional[RequestMetrics] = None) -> Optional[Dict[str, Any]]:
+    """Import a single vehicle via the API
 
-def import_vehicle(vehicle_data: Dict[str, Any], api_url: str, dry_run: bool) -> Optional[Dict[str, Any]]:
-    """Import a single vehicle via the API"""
+    Connection errors and retryable status codes are retried according to
+    ``retry_policy``; the vehicle only counts as failed once retries run out.
+    Pass a ``session`` from :func:`create_session` to reuse connections
+    between calls.
+    """
     if dry_run:
         logger.info(f"DRY RUN - Would import: {json.dumps(vehicle_data, indent=2)}")
         return {"id": "dry-run-id", "stockNumber": vehicle_data.get("stockNumber")}
     
     try:
-        response = requests.post(
+        response = _send_with_retry(
+            "POST",
             f"{api_url}/vehicles",
+            str(vehicle_data.get("stockNumber")),
+            rate_limiter, retry_policy, session, timeout, metrics,
             json=vehicle_data,
             headers={"Content-Type": "application/json"}
         )
-        
-        if response.status_code in [200, 201]:
-            return response.json()
-        else:
-            logger.error(f"API error ({response.status_code}): {response.text}")
-            return None
+        return response.json() if response is not None else None
+    except Exception as e:
+        logger.error(f"Exception during API call: {e}")
+        return None
+
+
+def update_vehicle(vehicle_id: str, vehicle_data: Dict[str, Any], api_url: str, dry_run: bool,
+                   rate_limiter: Optional[RateLimiter] = None,
+                   retry_policy: Optional[RetryPolicy] = None,
+                   session: Optional[requests.Session] = None,
+                   timeout: Optional[float] = DEFAULT_TIMEOUT,
+                   metrics: Optional[RequestMetrics] = None) -> Optional[Dict[str, Any]]:
+    """Update an existing vehicle via the API"""
+    if dry_run:
+        logger.info(f"DRY RUN - Would update {vehicle_id}: {json.dumps(vehicle_data, indent=2)}")
+        return {"id": vehicle_id, "stockNumber": vehicle_data.get("stockNumber")}
+    
+    try:
+        response = _send_with_retry(
+            "PUT",
+            f"{api_url}/vehicles/{vehicle_id}",
+            str(vehicle_data.get("stockNumber")),
+            rate_limiter, retry_policy, session, timeout, metrics,
+            json=vehicle_data,
+            headers={"Content-Type": "application/json"}
+        )
+        # The update endpoint answers 204 No Content
+        return {"id": vehicle_id, "stockNumber": vehicle_data.get("stockNumber")} if response is not None else None
+    except Exception as e:
+        logger.error(f"Exception during API call: {e}")
+        return None
+
+
+def find_vehicle_id(vin: Optional[str], api_url: str,
+                    rate_limiter: Optional[RateLimiter] = None,
+                    retry_policy: Optional[RetryPolicy] = None,
+                    session: Optional[requests.Session] = None,
+                    timeout: Optional[float] = DEFAULT_TIMEOUT,
+                    metrics: Optional[RequestMetrics] = None) -> Optional[str]:
+    """Look up the ID of the vehicle with ``vin``, or None if the API has none"""
+    if not vin:
+        return None
+    try:
+        response = _send_with_retry("GET", f"{api_url}/vehicles/vin/{vin}", vin,
+                                    rate_limiter, retry_policy, session, timeout, metrics)
+        return response.json().get("id") if response is not None else None
     except Exception as e:
         logger.error(f"Exception during API call: {e}")
         return None
 
 
-def process_csv_file(file_path: str, api_url: str, dry_run: bool) -> Dict[str, int]:
-    """Process the CSV file and import vehicles"""
+def _bulk_csv(vehicles: List[Dict[str, Any]]) -> str:
+    """Render transformed vehicles as CSV in the bulk import template's column layout"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(BULK_TEMPLATE_COLUMNS.values())
+    for vehicle in vehicles:
+        writer.writerow(["" if vehicle.get(api_field) is None else vehicle.get(api_field)
+                         for api_field in BULK_TEMPLATE_COLUMNS])
+    return buffer.getvalue()
+
+
+def import_vehicle_batch(vehicles: List[Dict[str, Any]], api_url: str, dry_run: bool,
+                         template_name: str = DEFAULT_BULK_TEMPLATE,
+                         rate_limiter: Optional[RateLimiter] = None,
+                         retry_policy: Optional[RetryPolicy] = None,
+                         session: Optional[requests.Session] = None,
+                         timeout: Optional[float] = DEFAULT_BULK_TIMEOUT,
+                         metrics: Optional[RequestMetrics] = None) -> List[Optional[Dict[str, Any]]]:
+    """Import a batch of vehicles in one call to the CSV import endpoint
+
+    Returns one entry per vehicle, in order: the imported vehicle's
+    stock number and ID, or None if that vehicle failed.
+
+    The endpoint does not check for existing VINs, so a batch is never sent
+    again once the API may have received it (see :func:`_send_with_retry`);
+    a batch that timed out counts as failed and needs checking before it
+    is imported again.
+    """
+    if dry_run:
+        logger.info(f"DRY RUN - Would bulk import {len(vehicles)} vehicles using template {template_name}")
+        return [{"id": "dry-run-id", "stockNumber": vehicle.get("stockNumber")} for vehicle in vehicles]
+    
+    first, last = vehicles[0].get("stockNumber"), vehicles[-1].get("stockNumber")
+    try:
+        response = _send_with_retry(
+            "POST",
+            f"{api_url}/inventory/import/csv",
+            f"batch {first}..{last}",
+            rate_limiter, retry_policy, session, timeout, metrics,
+            idempotent=False,
+            files={"file": ("vehicles.csv", _bulk_csv(vehicles), "text/csv")},
+            data={"templateName": template_name}
+        )
+        if response is None:
+            return [None] * len(vehicles)
+        import_result = response.json()
+    except Exception as e:
+        logger.error(f"Exception during bulk API call: {e}")
+        return [None] * len(vehicles)
+    
+    # Map the endpoint's error messages back to positions in the batch. Row
+    # numbers in those messages are file line numbers, so the header is line 1.
+    failed = set()
+    for message in import_result.get("errors") or []:
+        match = BULK_ROW_ERROR_PATTERN.match(message)
+        if not match:
+            # Batch-level failure (e.g. the final save) - nothing was committed
+            logger.error(f"Bulk import of {first}..{last} failed: {message}")
+            return [None] * len(vehicles)
+        failed.add(int(match.group(1)) - 2)
+        logger.error(f"Bulk import error: {message}")
+    
+    imported_ids = iter(import_result.get("importedVehicleIds") or [])
+    return [None if index in failed else {"id": next(imported_ids, None), "stockNumber": vehicle.get("stockNumber")}
+            for index, vehicle in enumerate(vehicles)]
+
+
+def _changed_vehicle(vehicle_data: Dict[str, Any],
+                     delta_index: Optional[DeltaIndex]) -> Tuple[bool, Optional[str], Optional[str]]:
+    """Compare a payload with the delta index, returning (changed, payload hash, known vehicle ID)"""
+    if delta_index is None:
+        return True, None, None
+    digest = DeltaIndex.payload_hash(vehicle_data)
+    entry = delta_index.get(vehicle_data.get("vin"))
+    if entry is None:
+        return True, digest, None
+    return entry.get("hash") != digest, digest, entry.get("id")
+
+
+def _import_row(row_number: int, row: Dict[str, str], api_url: str, dry_run: bool,
+                delta_index: Optional[DeltaIndex] = None,
+                transformer: Optional[RowTransformer] = None,
+                **request_options: Any) -> List[Tuple[int, Optional[str], Any]]:
+    """Transform and import a single CSV row, returning [(row number, row key, result)]
+
+    With a ``delta_index``, unchanged rows produce :data:`UNCHANGED` and rows
+    the index already has a vehicle ID for are sent as updates.
+    """
+    key = row_key(row)
+    try:
+        vehicle_data = transformer.transform(row) if transformer else transform_row(row)
+        changed, digest, vehicle_id = _changed_vehicle(vehicle_data, delta_index)
+        if not changed:
+            return [(row_number, key, UNCHANGED)]
+        
+        if vehicle_id:
+            result = update_vehicle(vehicle_id, vehicle_data, api_url, dry_run, **request_options)
+        else:
+            result = import_vehicle(vehicle_data, api_url, dry_run, **request_options)
+        
+        if result and digest and not dry_run:
+            delta_index.update(vehicle_data.get("vin"), digest, result.get("id"))
+        return [(row_number, key, result)]
+    except Exception as e:
+        logger.error(f"Error processing row {row_number}: {e}")
+        logger.debug(traceback.format_exc())
+        return [(row_number, key, None)]
+
+
+def _import_chunk(chunk: List[Tuple[int, Dict[str, str]]], api_url: str, dry_run: bool,
+                  template_name: str = DEFAULT_BULK_TEMPLATE,
+                  delta_index: Optional[DeltaIndex] = None,
+                  transformer: Optional[RowTransformer] = None,
+                  bulk_timeout: Optional[float] = DEFAULT_BULK_TIMEOUT,
+                  **request_options: Any) -> List[Tuple[int, Optional[str], Any]]:
+    """Transform and bulk import a chunk of (row number, row) pairs
+
+    The bulk endpoint can only create vehicles, so with a ``delta_index``
+    rows that changed since an earlier import are sent as single updates.
+    The bulk call waits up to ``bulk_timeout`` seconds instead of the
+    ``timeout`` of single-row calls.
+    """
+    outcomes: List[Tuple[int, Optional[str], Any]] = []
+    batch: List[Tuple[int, Optional[str], Dict[str, Any], Optional[str]]] = []
+    for row_number, row in chunk:
+        key = row_key(row)
+        try:
+            vehicle_data = transformer.transform(row) if transformer else transform_row(row)
+            changed, digest, vehicle_id = _changed_vehicle(vehicle_data, delta_index)
+            if not changed:
+                outcomes.append((row_number, key, UNCHANGED))
+            elif vehicle_id:
+                result = update_vehicle(vehicle_id, vehicle_data, api_url, dry_run, **request_options)
+                if result and not dry_run:
+                    delta_index.update(vehicle_data.get("vin"), digest, vehicle_id)
+                outcomes.append((row_number, key, result))
+            else:
+                batch.append((row_number, key, vehicle_data, digest))
+        except Exception as e:
+            logger.error(f"Error processing row {row_number}: {e}")
+            logger.debug(traceback.format_exc())
+            outcomes.append((row_number, key, None))
+    
+    if batch:
+        results = import_vehicle_batch([vehicle for _, _, vehicle, _ in batch], api_url, dry_run,
+                                       template_name, **{**request_options, "timeout": bulk_timeout})
+        for (row_number, key, vehicle_data, digest), result in zip(batch, results):
+            if result and digest and not dry_run:
+                vin = vehicle_data.get("vin")
+                # The bulk response may leave out IDs; the index needs one to send later changes as updates
+                if result.get("id") is None:
+                    result["id"] = find_vehicle_id(vin, api_url, **request_options)
+                if result.get("id") is None:
+                    logger.warning(f"No vehicle ID found for VIN {vin}, leaving it out of the delta index")
+                else:
+                    delta_index.update(vin, digest, result["id"])
+            outcomes.append((row_number, key, result))
+    return outcomes
+
+
+def _warn_bulk_dropped_columns(fieldnames: Optional[List[str]]) -> None:
+    """Warn about feed columns that bulk mode cannot send, as vehicles it creates lose them"""
+    dropped = [csv_field for csv_field, api_field in FIELD_MAPPINGS.items()
+               if csv_field in (fieldnames or []) and api_field not in BULK_TEMPLATE_COLUMNS]
+    if dropped:
+        logger.warning(f"Bulk mode cannot send these columns; new vehicles are created without them: "
+                       f"{', '.join(dropped)}. Use --mode row to import them.")
+
+
+def _chunked(rows: Iterable[Tuple[int, Dict[str, str]]], size: int) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+    """Group (row number, row) pairs into lists of at most ``size`` entries"""
+    chunk: List[Tuple[int, Dict[str, str]]] = []
+    for row_number, row in rows:
+        chunk.append((row_number, row))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _record_result(stats: Dict[str, int], failed_rows: List[Tuple[int, Optional[str]]],
+                   row_number: int, key: Optional[str],
+                   result: Optional[Dict[str, Any]],
+                   checkpoint: Optional[CheckpointJournal] = None,
+                   log_every: int = 1) -> None:
+    """Update the import statistics with the outcome of one row
+
+    Only one in ``log_every`` imported rows is logged (none when 0); failed
+    rows are always logged.
+    """
+    stats["total"] += 1
+    if result is UNCHANGED:
+        stats["skipped"] += 1
+    elif result:
+        stats["success"] += 1
+        if log_every and stats["success"] % log_every == 0:
+            logger.info(f"Imported vehicle: {result.get('stockNumber')} (ID: {result.get('id')})")
+        if checkpoint is not None:
+            checkpoint.record(key, result.get("id"))
+    else:
+        logger.error(f"Failed to import vehicle: {key} (row {row_number})")
+        stats["error"] += 1
+        failed_rows.append((row_number, key))
+
+
+def process_csv_file(file_path: str, api_url: str, dry_run: bool, workers: int = 1,
+                     max_in_flight: Optional[int] = None,
+                     rate_limiter: Optional[RateLimiter] = None,
+                     retry_policy: Optional[RetryPolicy] = None,
+                     session: Optional[requests.Session] = None,
+                     timeout: Optional[float] = DEFAULT_TIMEOUT,
+                     mode: str = "row", chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     template_name: str = DEFAULT_BULK_TEMPLATE,
+                     bulk_timeout: Optional[float] = DEFAULT_BULK_TIMEOUT,
+                     checkpoint: Optional[CheckpointJournal] = None,
+                     delta_index: Optional[DeltaIndex] = None,
+                     file_format: str = "auto",
+                     metrics: Optional[RequestMetrics] = None,
+                     progress: Optional[ProgressReporter] = None,
+                     log_every: int = 1) -> Dict[str, int]:
+    """Process the feed file and import vehicles
+
+    The file may be CSV, JSON Lines or Parquet (``file_format``, detected
+    by default), with CSV and JSON Lines optionally gzip-compressed. It is
+    read on a background thread, so decompression and parsing overlap with
+    the API calls.
+
+    In ``row`` mode each vehicle is posted to ``/vehicles`` on its own. In
+    ``bulk`` mode rows are sent ``chunk_size`` at a time to the inventory CSV
+    import endpoint, waiting up to ``bulk_timeout`` seconds for each chunk,
+    and the per-row outcome is mapped back into the stats. Feed columns the
+    bulk template has no place for are logged as a warning and not sent.
+
+    Request pacing is left to ``rate_limiter``, which is shared by all workers.
+    All requests go through one pooled ``session``; if none is given, one sized
+    for ``workers`` is created for the duration of the import.
+
+    With ``workers`` greater than one, requests are sent concurrently by a
+    thread pool. At most ``max_in_flight`` requests (default: twice the worker
+    count) are submitted but not yet finished at any time, so memory stays
+    bounded no matter how large the file is. Statistics are only updated from
+    the calling thread as results come back.
+
+    Rows committed by the API are recorded in ``checkpoint``. Rows it already
+    lists from an earlier run are skipped without being sent.
+
+    With a ``delta_index`` only new and changed rows are sent: rows whose
+    payload hash matches the index are counted as skipped, and rows the index
+    already knows are updated rather than created. The index is saved when the
+    import finishes.
+
+    Request latencies and status codes are recorded in ``metrics``, and a
+    ``progress`` reporter follows the import while it runs. On big feeds,
+    ``log_every`` keeps the per-row log down to one line per that many rows.
+    """
     stats = {"total": 0, "success": 0, "error": 0, "skipped": 0}
+    failed_rows: List[Tuple[int, Optional[str]]] = []
+    owns_session = session is None
+    if owns_session:
+        session = create_session(max(workers, DEFAULT_POOL_SIZE))
+    request_options = {"rate_limiter": rate_limiter, "retry_policy": retry_policy,
+                       "session": session, "timeout": timeout, "metrics": metrics}
+    
+    def record(outcomes):
+        for outcome in outcomes:
+            _record_result(stats, failed_rows, *outcome, checkpoint=checkpoint, log_every=log_every)
+    
+    def pending_rows(reader):
+        for row_number, row in enumerate(reader, start=1):
+            if checkpoint is not None and row_key(row) in checkpoint:
+                stats["total"] += 1
+                stats["skipped"] += 1
+                continue
+            yield row_number, row
     
     try:
-        with open(file_path, 'r', encoding='utf-8-sig') as csvfile:
-            reader = csv.DictReader(csvfile)
-            
+        with open_feed(file_path, file_format, progress) as (fieldnames, rows):
             # Validate headers
-            if not validate_csv_headers(reader.fieldnames):
+            if not validate_csv_headers(fieldnames):
                 logger.error("CSV validation failed - missing required headers")
                 return stats
             
-            for row in reader:
-                stats["total"] += 1
-                
-                try:
-                    # Transform the data
-                    vehicle_data = transform_row(row)
-                    
-                    # Import the vehicle
-                    result = import_vehicle(vehicle_data, api_url, dry_run)
-                    
-                    if result:
-                        logger.info(f"Imported vehicle: {result.get('stockNumber')} (ID: {result.get('id')})")
-                        stats["success"] += 1
-                    else:
-                        logger.error(f"Failed to import vehicle: {row.get('stock_number')}")
-                        stats["error"] += 1
-                
-                except Exception as e:
-                    logger.error(f"Error processing row {stats['total']}: {e}")
-                    logger.debug(traceback.format_exc())
-                    stats["error"] += 1
+            if progress is not None:
+                progress.start(stats)
+            transformer = RowTransformer(fieldnames)
+            with contextlib.closing(_prefetch(rows)) as reader:
+                if mode == "bulk":
+                    _warn_bulk_dropped_columns(fieldnames)
+                    import_func = functools.partial(_import_chunk, template_name=template_name,
+                                                    delta_index=delta_index, transformer=transformer,
+                                                    bulk_timeout=bulk_timeout)
+                    work_items = ((chunk,) for chunk in _chunked(pending_rows(reader), chunk_size))
+                else:
+                    import_func = functools.partial(_import_row, delta_index=delta_index, transformer=transformer)
+                    work_items = pending_rows(reader)
                 
-                # Add a small delay to not overwhelm the API
-                if not dry_run and stats["total"] % 10 == 0:
-                    time.sleep(1)
+                if workers <= 1:
+                    for args in work_items:
+                        record(import_func(*args, api_url, dry_run, **request_options))
+                else:
+                    limit = max_in_flight or workers * 2
+                    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import") as executor:
+                        pending = set()
+                        for args in work_items:
+                            pending.add(executor.submit(import_func, *args, api_url, dry_run, **request_options))
+                            
+                            # Bound the number of in-flight requests
+                            if len(pending) >= limit:
+                                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                                for future in done:
+                                    record(future.result())
+                        
+                        for future in wait(pending).done:
+                            record(future.result())
     
     except FileNotFoundError:
         logger.error(f"File not found: {file_path}")
     except Exception as e:
         logger.error(f"Error processing CSV file: {e}")
         logger.debug(traceback.format_exc())
+    finally:
+        if progress is not None:
+            progress.stop()
+        if owns_session:
+            session.close()
+        if checkpoint is not None:
+            checkpoint.flush()
+        if delta_index is not None and not dry_run:
+            delta_index.save()
+    
+    if stats["skipped"]:
+        logger.info(f"Skipped {stats['skipped']} rows already imported or unchanged")
+    
+    if failed_rows:
+        failed_rows.sort()
+        logger.error("Failed rows: " + ", ".join(f"{row_number} ({key})" for row_number, key in failed_rows))
     
     return stats
 
 
+async def _send_with_retry_async(http: Any, method: str, url: str, label: str,
+                                 rate_limiter: Optional[RateLimiter] = None,
+                                 retry_policy: Optional[RetryPolicy] = None,
+                                 metrics: Optional[RequestMetrics] = None,
+                                 **request_kwargs: Any) -> Optional[str]:
+    """Asyncio counterpart of :func:`_send_with_retry` for an aiohttp session
+
+    Returns the body of the successful response, or None once ``retry_policy``
+    gives up.
+    """
+    import asyncio
+    import aiohttp
+    
+    retry_policy = retry_policy or RetryPolicy()
+    
+    for attempt in range(retry_policy.max_retries + 1):
+        retries_left = attempt < retry_policy.max_retries
+        if rate_limiter:
+            wait_time = rate_limiter.reserve()
+            if wait_time > 0:
+                await asyncio.sleep(wait_time)
+        
+        start = time.perf_counter()
+        status = None
+        try:
+            async with http.request(method, url, **request_kwargs) as response:
+                status = response.status
+                body = await response.text()
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if retries_left:
+                delay = retry_policy.delay(attempt)
+                logger.warning(f"Request for {label} failed ({e!r}) - retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            logger.error(f"Exception during API call: {e!r}")
+            return None
+        finally:
+            if metrics is not None:
+                metrics.record(time.perf_counter() - start, status)
+        
+        if status in [200, 201, 204]:
+            if rate_limiter:
+                rate_limiter.recover()
+            return body
+        
+        if rate_limiter and status in THROTTLE_STATUS_CODES:
+            rate_limiter.backoff(retry_after)
+        
+        if status in RETRYABLE_STATUS_CODES and retries_left:
+            delay = retry_policy.delay(attempt, retry_after)
+            logger.warning(f"API error ({status}) for {label} - retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        
+        logger.error(f"API error ({status}): {body}")
+        return None
+    
+    return None
+
+
+def _feed_batches(rows: Iterable[Dict[str, Any]], batches: "asyncio.Queue[Any]",
+                  loop: asyncio.AbstractEventLoop, stop: threading.Event) -> None:
+    """Reader thread for the asyncio engine: parse the feed and hand rows to the loop in batches
+
+    Waiting for each put to complete gives the reader the same backpressure as
+    the rest of the pipeline. The reader always ends by queueing None or the
+    exception that stopped it, since the transform stage waits on the queue
+    until it gets one of them.
+    """
+    import asyncio
+    
+    def put(item: Any) -> bool:
+        future = asyncio.run_coroutine_threadsafe(batches.put(item), loop)
+        while not stop.is_set():
+            try:
+                future.result(timeout=0.1)
+                return True
+            except FutureTimeoutError:
+                # Before Python 3.11 this is not the builtin TimeoutError
+                continue
+        future.cancel()
+        return False
+    
+    try:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= PREFETCH_BATCH_ROWS:
+                if not put(batch):
+                    return
+                batch = []
+        if batch and not put(batch):
+            return
+        put(None)
+    except BaseException as e:
+        try:
+            put(e)
+        except BaseException:
+            # Only left when the event loop itself is gone, with nobody waiting on the queue
+            logger.error(f"Feed reader failed and could not report it: {e!r}")
+
+
+async def _process_feed_async(file_path: str, api_url: str, dry_run: bool, concurrency: int,
+                              rate_limiter: Optional[RateLimiter], retry_policy: Optional[RetryPolicy],
+                              timeout: Optional[float], pool_size: int,
+                              checkpoint: Optional[CheckpointJournal], delta_index: Optional[DeltaIndex],
+                              file_format: str, metrics: Optional[RequestMetrics],
+                              progress: Optional[ProgressReporter], log_every: int) -> Dict[str, int]:
+    import asyncio
+    import aiohttp
+    
+    stats = {"total": 0, "success": 0, "error": 0, "skipped": 0}
+    failed_rows: List[Tuple[int, Optional[str]]] = []
+    loop = asyncio.get_running_loop()
+    batches: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=PREFETCH_DEPTH)
+    work: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=concurrency * 2)
+    stop = threading.Event()
+    
+    async def transform_stage(transformer: RowTransformer) -> None:
+        row_number = 0
+        try:
+            while True:
+                batch = await batches.get()
+                if batch is None:
+                    break
+                if isinstance(batch, BaseException):
+                    raise batch
+                for row in batch:
+                    row_number += 1
+                    key = row_key(row)
+                    if checkpoint is not None and key in checkpoint:
+                        stats["total"] += 1
+                        stats["skipped"] += 1
+                        continue
+                    try:
+                        vehicle_data = transformer.transform(row)
+                        changed, digest, vehicle_id = _changed_vehicle(vehicle_data, delta_index)
+                    except Exception as e:
+                        logger.error(f"Error processing row {row_number}: {e}")
+                        _record_result(stats, failed_rows, row_number, key, None, checkpoint, log_every)
+                        continue
+                    if not changed:
+                        _record_result(stats, failed_rows, row_number, key, UNCHANGED, checkpoint, log_every)
+                        continue
+                    await work.put((row_number, key, vehicle_data, digest, vehicle_id))
+        finally:
+            for _ in range(concurrency):
+                await work.put(None)
+    
+    async def submitter(http: Any) -> None:
+        while True:
+            item = await work.get()
+            if item is None:
+                return
+            row_number, key, vehicle_data, digest, vehicle_id = item
+            label = str(vehicle_data.get("stockNumber"))
+            result = None
+            try:
+                if dry_run:
+                    logger.info(f"DRY RUN - Would {'update' if vehicle_id else 'import'}: {json.dumps(vehicle_data)}")
+                    result = {"id": vehicle_id or "dry-run-id", "stockNumber": vehicle_data.get("stockNumber")}
+                elif vehicle_id:
+                    body = await _send_with_retry_async(http, "PUT", f"{api_url}/vehicles/{vehicle_id}", label,
+                                                        rate_limiter, retry_policy, metrics, json=vehicle_data)
+                    if body is not None:
+                        result = {"id": vehicle_id, "stockNumber": vehicle_data.get("stockNumber")}
+                else:
+                    body = await _send_with_retry_async(http, "POST", f"{api_url}/vehicles", label,
+                                                        rate_limiter, retry_policy, metrics, json=vehicle_data)
+                    if body is not None:
+                        result = json.loads(body)
+            except Exception as e:
+                logger.error(f"Exception during API call: {e}")
+            
+            if result and digest and not dry_run:
+                delta_index.update(vehicle_data.get("vin"), digest, result.get("id"))
+            _record_result(stats, failed_rows, row_number, key, result, checkpoint, log_every)
+    
+    try:
+        with open_feed(file_path, file_format, progress) as (fieldnames, rows):
+            # Validate headers
+            if not validate_csv_headers(fieldnames):
+                logger.error("CSV validation failed - missing required headers")
+                return stats
+            
+            if progress is not None:
+                progress.start(stats)
+            reader_thread = threading.Thread(target=_feed_batches, args=(rows, batches, loop, stop),
+                                             name="feed-reader", daemon=True)
+            reader_thread.start()
+            connector = aiohttp.TCPConnector(limit=pool_size)
+            client_timeout = aiohttp.ClientTimeout(total=timeout)
+            try:
+                async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as http:
+                    await asyncio.gather(transform_stage(RowTransformer(fieldnames)),
+                                         *(submitter(http) for _ in range(concurrency)))
+            finally:
+                stop.set()
+                await loop.run_in_executor(None, reader_thread.join)
+    
+    except FileNotFoundError:
+        logger.error(f"File not found: {file_path}")
+    except Exception as e:
+        logger.error(f"Error processing CSV file: {e}")
+        logger.debug(traceback.format_exc())
+    finally:
+        if progress is not None:
+            progress.stop()
+        if checkpoint is not None:
+            checkpoint.flush()
+        if delta_index is not None and not dry_run:
+            delta_index.save()
+    
+    if stats["skipped"]:
+        logger.info(f"Skipped {stats['skipped']} rows already imported or unchanged")
+    
+    if failed_rows:
+        failed_rows.sort()
+        logger.error("Failed rows: " + ", ".join(f"{row_number} ({key})" for row_number, key in failed_rows))
+    
+    return stats
+
+
+def process_file_async(file_path: str, api_url: str, dry_run: bool,
+                       concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+                       rate_limiter: Optional[RateLimiter] = None,
+                       retry_policy: Optional[RetryPolicy] = None,
+                       timeout: Optional[float] = DEFAULT_TIMEOUT,
+                       pool_size: Optional[int] = None,
+                       checkpoint: Optional[CheckpointJournal] = None,
+                       delta_index: Optional[DeltaIndex] = None,
+                       file_format: str = "auto",
+                       metrics: Optional[RequestMetrics] = None,
+                       progress: Optional[ProgressReporter] = None,
+                       log_every: int = 1) -> Dict[str, int]:
+    """Import a feed with the asyncio engine
+
+    The feed is parsed on a reader thread and flows through bounded queues to
+    a transform stage and ``concurrency`` submitter coroutines sharing one
+    aiohttp connection pool, so a single process can keep hundreds of
+    requests in flight with backpressure all the way back to the file.
+    Vehicles are sent one per request (row mode); checkpoints, delta
+    indexes, rate limiting, retries, metrics, progress and row logging behave
+    as in :func:`process_csv_file`.
+    """
+    import asyncio
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        raise ImportError("aiohttp is required for the async engine. Please install it with: pip install aiohttp") from None
+    return asyncio.run(_process_feed_async(file_path, api_url, dry_run, concurrency, rate_limiter, retry_policy,
+                                           timeout, pool_size or concurrency, checkpoint, delta_index,
+                                           file_format, metrics, progress, log_every))
+
+
+def configure_logging(log_file: Optional[str] = None) -> None:
+    """Log to stdout and to ``log_file`` (default: a timestamped file in the working directory)"""
+    log_file = log_file or f"inventory_import_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Import vehicle inventory from CSV file")
-    parser.add_argument("--file", required=True, help="Input CSV file")
+    parser = argparse.ArgumentParser(description="Import vehicle inventory from a CSV, JSON Lines or Parquet feed")
+    parser.add_argument("--file", required=True, help="Input file: CSV, JSON Lines or Parquet, optionally gzipped")
+    parser.add_argument("--format", choices=["auto"] + FEED_FORMATS, default="auto",
+                        help="Input file format (default: detect from the file name and contents)")
     parser.add_argument("--api-url", default=DEFAULT_API_URL, help=f"API URL (default: {DEFAULT_API_URL})")
     parser.add_argument("--dry-run", action="store_true", help="Dry run - don't actually import")
+    parser.add_argument("--engine", choices=["thread", "async"], default="thread",
+                        help="thread: thread pool of --workers; async: asyncio with aiohttp (default: thread)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of concurrent API requests for the thread engine (default: 1, sequential)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Maximum rows submitted but not yet completed "
+                             f"(default: 2 x workers, or {DEFAULT_ASYNC_CONCURRENCY} with --engine async)")
+    parser.add_argument("--rate-limit", type=float, default=DEFAULT_RATE_LIMIT,
+                        help=f"Maximum API requests per second, 0 for unlimited (default: {DEFAULT_RATE_LIMIT})")
+    parser.add_argument("--burst", type=float, default=None,
+                        help="Requests allowed in a burst above the rate limit (default: one second's worth)")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+                        help=f"Retries for failed API calls before a row counts as an error (default: {DEFAULT_MAX_RETRIES})")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help=f"Keep-alive connections to the API (default: workers, at least {DEFAULT_POOL_SIZE})")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Timeout for each API call in seconds (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--mode", choices=["row", "bulk"], default="row",
+                        help="row: one request per vehicle; bulk: chunks through the CSV import endpoint (default: row)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Rows per request in bulk mode (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--bulk-timeout", type=float, default=DEFAULT_BULK_TIMEOUT,
+                        help=f"Timeout for each bulk API call in seconds; bulk calls are not retried "
+                             f"after a timeout (default: {DEFAULT_BULK_TIMEOUT})")
+    parser.add_argument("--bulk-template", default=DEFAULT_BULK_TEMPLATE,
+                        help=f"Mapping template for bulk mode (default: {DEFAULT_BULK_TEMPLATE})")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Record committed rows in this journal so the import can be resumed (default: none)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip rows already recorded in the checkpoint journal by an earlier run "
+                             "(journal default: INPUT_FILE.checkpoint)")
+    parser.add_argument("--delta-index", default=None,
+                        help="VIN to payload-hash index; only new and changed rows are sent when given")
+    parser.add_argument("--progress", action="store_true",
+                        help="Show a live progress line with rows/s, error rate and ETA")
+    parser.add_argument("--progress-interval", type=float, default=DEFAULT_PROGRESS_INTERVAL,
+                        help=f"Seconds between progress updates (default: {DEFAULT_PROGRESS_INTERVAL})")
+    parser.add_argument("--log-every", type=int, default=1,
+                        help="Log one in every N imported rows, 0 for none; failures are always logged (default: 1)")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Write run metrics (row counts, latency histogram, status codes) to this JSON file")
+    parser.add_argument("--log-file", default=None,
+                        help="Log file (default: inventory_import_YYYYMMDD_HHMMSS.log)")
+    parser.add_argument("--validate-only", action="store_true",
+                        help="Check the whole file and write an error report without calling the API")
+    parser.add_argument("--report", default=None,
+                        help="Validation report path (default: INPUT_FILE.validation.json)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Processes used by --validate-only (default: one per CPU)")
     
     args = parser.parse_args()
     
+    if args.engine == "async" and args.mode == "bulk":
+        parser.error("--mode bulk is only supported by the thread engine")
+    
+    configure_logging(args.log_file)
+    
+    if args.validate_only:
+        report_path = args.report or f"{args.file}.validation.json"
+        logger.info(f"Validating {args.file}")
+        start_time = time.time()
+        try:
+            summary = validate_file(args.file, report_path, args.format, args.processes)
+        except FileNotFoundError:
+            logger.error(f"File not found: {args.file}")
+            sys.exit(1)
+        logger.info(f"Validation completed in {time.time() - start_time:.2f} seconds")
+        logger.info(f"Total records: {summary['total_rows']}")
+        logger.info(f"Invalid records: {summary['invalid_rows']}")
+        for code, count in sorted(summary["errors_by_code"].items()):
+            logger.info(f"  {code}: {count}")
+        logger.info(f"Report written to {report_path}")
+        sys.exit(0 if summary["valid"] else 1)
+    
     logger.info(f"Starting inventory import from {args.file}")
     logger.info(f"API URL: {args.api_url}")
     logger.info(f"Dry run: {args.dry_run}")
+    logger.info(f"Mode: {args.mode}")
+    logger.info(f"Engine: {args.engine}")
+    if args.engine == "async":
+        logger.info(f"Requests in flight: {args.max_in_flight or DEFAULT_ASYNC_CONCURRENCY}")
+    else:
+        logger.info(f"Workers: {args.workers}")
+    logger.info(f"Rate limit: {args.rate_limit or 'unlimited'} requests/s")
+    
+    rate_limiter = RateLimiter(args.rate_limit, args.burst) if args.rate_limit > 0 else None
+    retry_policy = RetryPolicy(max_retries=args.max_retries)
+    
+    pool_size = args.pool_size or max(args.workers, DEFAULT_POOL_SIZE)
     
+    # Journaling is opt-in: it writes next to the input (or to --checkpoint)
+    # and starts the journal afresh unless resuming
+    checkpoint = None
+    if not args.dry_run and (args.checkpoint or args.resume):
+        checkpoint_path = args.checkpoint or f"{args.file}.checkpoint"
+        logger.info(f"Checkpoint: {checkpoint_path}{' (resuming)' if args.resume else ''}")
+        checkpoint = CheckpointJournal(checkpoint_path, resume=args.resume)
+    
+    delta_index = DeltaIndex(args.delta_index) if args.delta_index else None
+    metrics = RequestMetrics()
+    progress = ProgressReporter(args.progress_interval) if args.progress else None
+    
+    started_at = datetime.now(timezone.utc)
     start_time = time.time()
-    stats = process_csv_file(args.file, args.api_url, args.dry_run)
+    try:
+        if args.engine == "async":
+            stats = process_file_async(args.file, args.api_url, args.dry_run,
+                                       concurrency=args.max_in_flight or DEFAULT_ASYNC_CONCURRENCY,
+                                       rate_limiter=rate_limiter, retry_policy=retry_policy,
+                                       timeout=args.timeout, pool_size=args.pool_size,
+                                       checkpoint=checkpoint, delta_index=delta_index,
+                                       file_format=args.format, metrics=metrics,
+                                       progress=progress, log_every=args.log_every)
+        else:
+            with create_session(pool_size) as session:
+                stats = process_csv_file(args.file, args.api_url, args.dry_run,
+                                         workers=args.workers, max_in_flight=args.max_in_flight,
+                                         rate_limiter=rate_limiter, retry_policy=retry_policy,
+                                         session=session, timeout=args.timeout,
+                                         mode=args.mode, chunk_size=args.chunk_size,
+                                         template_name=args.bulk_template, bulk_timeout=args.bulk_timeout,
+                                         checkpoint=checkpoint,
+                                         delta_index=delta_index, file_format=args.format,
+                                         metrics=metrics, progress=progress, log_every=args.log_every)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
     elapsed_time = time.time() - start_time
     
     logger.info("Import completed")
@@ -207,6 +1832,28 @@ def main():
     logger.info(f"Successfully imported: {stats['success']}")
     logger.info(f"Errors: {stats['error']}")
     logger.info(f"Skipped: {stats['skipped']}")
+    logger.info(f"Throughput: {stats['total'] / elapsed_time if elapsed_time else 0:.1f} rows/s")
+    p50, p95, p99 = metrics.percentiles(50, 95, 99)
+    if p50 is not None:
+        logger.info(f"Request latency: p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms, "
+                    f"p99 {p99 * 1000:.0f} ms ({len(metrics.latencies)} requests)")
+    
+    if args.metrics_file:
+        run_metrics = {
+            "file": args.file,
+            "engine": args.engine,
+            "mode": args.mode,
+            "dry_run": args.dry_run,
+            "started_at": started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "elapsed_seconds": elapsed_time,
+            "rows": stats,
+            "rows_per_second": stats["total"] / elapsed_time if elapsed_time else 0.0,
+            "requests": metrics.summary()
+        }
+        with open(args.metrics_file, 'w', encoding='utf-8') as metrics_file:
+            json.dump(run_metrics, metrics_file, indent=2)
+        logger.info(f"Metrics written to {args.metrics_file}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Data Mart Load Benchmark
+
+Measures how many rows per second DataMartETL.load_data_mart writes into the
+reporting database, comparing the original DataFrame.to_sql path with the
+COPY FROM STDIN loader. A synthetic frame shaped like the sales analytics mart
+is loaded into a scratch table with each method in turn, and the table is
+dropped afterwards. Needs the database configured in config.json.
+
+Usage:
+    python benchmark_load.py [--config CONFIG_FILE] [--rows N] [--chunk-rows N] [--table TABLE_NAME]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from datamart_etl import DEFAULT_COPY_CHUNK_ROWS, DataMartETL
+
+DEFAULT_ROWS = 200_000
+DEFAULT_TABLE = "benchmark_load"
+
+MAKES = [("Honda", "Accord"), ("Toyota", "Camry"), ("Ford", "F-150"), ("Chevrolet", "Silverado"), ("BMW", "X5")]
+
+
+def generate_mart(rows: int) -> pd.DataFrame:
+    """Synthetic rows with the column mix of the sales analytics mart"""
+    rng = np.random.default_rng(42)
+    make_model = rng.integers(0, len(MAKES), rows)
+    sale_price = rng.uniform(18_000, 90_000, rows).round(2)
+    dealer_cost = (sale_price * rng.uniform(0.85, 0.97, rows)).round(2)
+    df = pd.DataFrame({
+        "SaleID": np.arange(rows),
+        "VehicleID": rng.integers(1, rows, rows),
+        "CustomerID": rng.integers(1, rows // 4 + 2, rows),
+        "SaleDate": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, rows), unit="D"),
+        "Make": [MAKES[i][0] for i in make_model],
+        "Model": [MAKES[i][1] for i in make_model],
+        "Year": rng.integers(2015, 2026, rows),
+        "SalePrice": sale_price,
+        "DealerCost": dealer_cost,
+        "GrossProfit": sale_price - dealer_cost,
+        "IsNew": rng.random(rows) < 0.6
+    })
+    # Leave some gaps so NULL handling is part of the timing
+    df.loc[df.sample(frac=0.05, random_state=42).index, "DealerCost"] = np.nan
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data mart load step")
+    parser.add_argument("--config", default="config.json", help="Path to configuration file")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help=f"Synthetic rows (default: {DEFAULT_ROWS})")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_COPY_CHUNK_ROWS,
+                        help=f"Rows per COPY chunk (default: {DEFAULT_COPY_CHUNK_ROWS})")
+    parser.add_argument("--table", default=DEFAULT_TABLE,
+                        help=f"Scratch table in the marts schema, dropped afterwards (default: {DEFAULT_TABLE})")
+
+    args = parser.parse_args()
+
+    print(f"Generating {args.rows:,} rows")
+    df = generate_mart(args.rows)
+
+    etl = DataMartETL(args.config)
+    etl.copy_chunk_rows = args.chunk_rows
+    try:
+        rates = {}
+        for method in ("to_sql", "copy"):
+            start = time.perf_counter()
+            etl.load_data_mart(df, args.table, method=method)
+            rates[method] = args.rows / (time.perf_counter() - start)
+
+        before, after = rates["to_sql"], rates["copy"]
+        print(f"Before (DataFrame.to_sql):  {before:,.0f} rows/s")
+        print(f"After  (COPY FROM STDIN):   {after:,.0f} rows/s")
+        print(f"Speed-up: {after / before:.2f}x")
+    finally:
+        with etl.conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS marts.{args.table}")
+        etl.conn.commit()
+        etl.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Data Mart Memory Benchmark
+
+Measures the peak resident memory of the extract and transform stages of a
+full refresh of the sales, service, inventory and customer marts, comparing
+pandas' inferred dtypes with the entity schemas and lookup columns from
+config.json. Each variant runs in its own process against a synthetic module
+API served page by page, so peak RSS is not shared between them. No database
+or module service is needed: the ETL is given a stub connection. The
+customer mart keeps its aggregates in PostgreSQL, so the stub takes its
+activity ledger and returns an empty state, and only the part of that
+transform that runs in this process is measured. The script exits with
+status 1 when the reduction misses the 3x target.
+
+Usage:
+    python benchmark_memory.py [--config CONFIG_FILE] [--rows N] [--page-size N] [--arrow-strings]
+
+Strings are inferred as Python objects, as by the pandas versions the
+scripts support before 3.0, which is the footprint the target is set
+against. pandas 3 infers Arrow strings, which already stores the ids that
+make up most of the extracts about as compactly as the schemas do;
+--arrow-strings measures with those and only reports the reduction.
+"""
+
+import argparse
+import json
+import operator
+import random
+import resource
+import subprocess
+import sys
+import uuid
+import zlib
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from datamart_etl import CUSTOMER_STATE_COLUMNS, DataMartETL
+
+DEFAULT_ROWS = 200_000
+DEFAULT_PAGE_SIZE = 5000
+
+# Required peak RSS reduction of the typed extracts over the inferred ones
+TARGET_REDUCTION = 3.0
+
+MAKES = [("Honda", "Accord"), ("Toyota", "Camry"), ("Ford", "F-150"), ("Chevrolet", "Silverado"), ("BMW", "X5")]
+STATES = ["CA", "TX", "FL", "NY", "IL", "WA"]
+CITIES = ["Springfield", "Riverside", "Franklin", "Greenville", "Madison", "Clinton"]
+START = datetime(2020, 1, 1)
+
+# Refreshes in dependency order, as (mart, refresh extracts, transform attribute of the ETL)
+MARTS = [
+    ("sales_analytics", [("sales", "sales"), ("inventory", "vehicles"), ("crm", "customers")],
+     "transforms.transform_sales_data"),
+    ("service_analytics", [("service", "ServiceOrders"), ("service", "TechnicianPerformance"),
+                           ("inventory", "vehicles")], "transforms.transform_service_data"),
+    ("inventory_analytics", [("inventory", "inventory"), ("inventory", "vehicles")],
+     "transforms.transform_inventory_data"),
+    ("customer_analytics", [("crm", "customers"), ("crm", "CustomerInteractions"), ("sales", "sales"),
+                            ("service", "ServiceOrders")], "transform_customer_data")
+]
+
+
+def entity_id(entity, i):
+    """Stable GUID for row ``i`` of an entity, like the module APIs return"""
+    return str(uuid.UUID(int=zlib.crc32(entity.encode()) << 64 | i))
+
+
+def day(rng):
+    return (START + timedelta(days=rng.randrange(5 * 365), seconds=rng.randrange(86400))).isoformat()
+
+
+def synthetic_record(entity, i, rows, rng):
+    """One API record of ``entity``; ``rows`` sizes the entities it references"""
+    if entity == "sales":
+        price = rng.uniform(18_000, 90_000)
+        return {"SaleId": entity_id(entity, i), "VehicleId": entity_id("vehicles", rng.randrange(rows)),
+                "CustomerId": entity_id("customers", rng.randrange(rows // 2)),
+                "SalespersonId": entity_id("salespeople", rng.randrange(50)), "SaleDate": day(rng),
+                "SalePrice": round(price, 2), "DealerCost": round(price * 0.9, 2),
+                "SaleType": rng.choice(["New", "Used", "CPO"]), "Status": "Completed"}
+    if entity == "vehicles":
+        make, model = rng.choice(MAKES)
+        return {"VehicleId": entity_id(entity, i), "VIN": f"1HGCM8263{i:08d}", "StockNumber": f"STK{i:07d}",
+                "Make": make, "Model": model, "Year": rng.randint(2015, 2025), "Trim": rng.choice(["LX", "EX", "Sport"]),
+                "ExteriorColor": rng.choice(["Black", "White", "Silver", "Red"]), "InteriorColor": "Gray",
+                "Mileage": rng.randrange(120_000), "VehicleType": rng.choice(["New", "Used"]), "Status": "Available",
+                "LotLocation": rng.choice(["North", "South"]), "ListPrice": rng.uniform(18_000, 90_000),
+                "MSRP": rng.uniform(18_000, 90_000), "AcquisitionCost": rng.uniform(15_000, 80_000),
+                "AcquisitionDate": day(rng), "Description": "Well maintained, one owner, full service history"}
+    if entity == "inventory":
+        return {"InventoryId": entity_id(entity, i), "VehicleId": entity_id("vehicles", i), "ReceivedDate": day(rng),
+                "Status": rng.choice(["Available", "OnHold", "InTransit"]), "LotLocation": rng.choice(["North", "South"]),
+                "ListPrice": rng.uniform(18_000, 90_000)}
+    if entity == "customers":
+        return {"CustomerId": entity_id(entity, i), "ContactType": rng.choice(["Lead", "Customer"]),
+                "FirstName": f"First{i}", "LastName": f"Last{i}", "Email": f"customer{i}@example.com",
+                "City": rng.choice(CITIES), "State": rng.choice(STATES), "CustomerSource": rng.choice(["Web", "Walk-in"]),
+                "CreatedAt": day(rng)}
+    if entity == "CustomerInteractions":
+        return {"InteractionId": entity_id(entity, i), "CustomerId": entity_id("customers", rng.randrange(rows // 2)),
+                "InteractionType": rng.choice(["Call", "Email", "Visit"]), "InteractionDate": day(rng),
+                "Notes": "Followed up about service appointment"}
+    if entity == "ServiceOrders":
+        estimated = rng.uniform(0.5, 8)
+        return {"ServiceOrderId": entity_id(entity, i), "CustomerId": entity_id("customers", rng.randrange(rows // 2)),
+                "VehicleId": entity_id("vehicles", rng.randrange(rows)),
+                "TechnicianId": entity_id("TechnicianPerformance", rng.randrange(200)), "CompletedDate": day(rng),
+                "LaborHours": estimated * rng.uniform(0.7, 1.3), "EstimatedHours": estimated,
+                "TotalCost": rng.uniform(50, 3000), "Status": "Completed"}
+    if entity == "TechnicianPerformance":
+        return {"TechnicianId": entity_id(entity, i), "TechnicianName": f"Technician {i}",
+                "Specialization": rng.choice(["Engine", "Electrical", "Body"]), "SkillLevel": rng.choice(["A", "B", "C"])}
+    raise ValueError(f"No synthetic data for {entity}")
+
+
+class SyntheticResponse:
+    def __init__(self, records):
+        # Decoded like a real response, so no two records share string objects
+        self.body = json.dumps(records)
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class SyntheticSession:
+    """Serves synthetic module API pages, generating each one on request"""
+
+    def __init__(self, rows):
+        self.totals = {"sales": rows, "vehicles": rows, "inventory": rows // 2, "customers": rows // 2,
+                       "CustomerInteractions": rows * 3, "ServiceOrders": rows * 2, "TechnicianPerformance": 200}
+
+    def get(self, url, params=None, timeout=None):
+        entity = url.rsplit("/", 1)[-1]
+        page_size, page = params["pageSize"], params["page"]
+        rng = random.Random(f"{entity}-{page}")
+        first = (page - 1) * page_size
+        last = min(first + page_size, self.totals[entity])
+        rows = self.totals["sales"]
+        return SyntheticResponse([synthetic_record(entity, i, rows, rng) for i in range(first, last)])
+
+    def close(self):
+        pass
+
+
+class StubCursor:
+    rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, sql, params=None):
+        pass
+
+    def copy_expert(self, sql, file):
+        if "TO STDOUT" in sql:
+            # An empty customer state, as on the first refresh
+            file.write(",".join(CUSTOMER_STATE_COLUMNS) + "\n")
+        else:
+            # Read in blocks, as psycopg2 does
+            while file.read(8192):
+                pass
+
+
+class StubConnection:
+    """Accepts the ETL's statements and COPYs without a database"""
+
+    def cursor(self):
+        return StubCursor()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def check_customer_segments(mart):
+    """Fail unless every customer is "Low Value"
+
+    The stub returns an empty customer state, so every customer ties at a
+    zero RFM score, and tied scores must not be ranked into a higher segment.
+    """
+    segments = mart["CustomerSegment"].value_counts()
+    if segments.get("Low Value", 0) != len(mart):
+        raise AssertionError(f"Customers without activity were segmented as {segments.to_dict()}")
+
+
+def run_worker(config_path, rows, page_size, typed, arrow_strings):
+    """Extract and transform every mart once and print the peak RSS it added, as JSON"""
+    try:
+        pd.set_option("future.infer_string", arrow_strings)
+    except KeyError:
+        # Before pandas 2.1 strings are always inferred as objects
+        pass
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    if not typed:
+        config.pop('schemas', None)
+        for settings in config['data_marts'].values():
+            settings.pop('lookup_columns', None)
+
+    # Staged extracts are read back from Parquet, which would measure the
+    # staging area instead of the extracts, and leave the data on disk
+    config.pop('staging', None)
+    config['extract'] = dict(config.get('extract', {}), page_size=page_size, timeout_seconds=None,
+                             max_memory_mb=float('inf'))
+    etl = DataMartETL(config=config, connect=StubConnection, session=SyntheticSession(rows))
+
+    pd.DataFrame({"warm-up": [1]}).merge(pd.DataFrame({"warm-up": [1]}))
+    baseline = peak_rss_mb()
+    # A run keeps its extracts in the cache for every mart that needs them
+    extracts = {}
+    for mart_name, mart_extracts, transform in MARTS:
+        frames = []
+        for module, entity in mart_extracts:
+            if (module, entity) not in extracts:
+                extracts[(module, entity)] = etl.extract_module_data(module, entity)
+            frames.append(extracts[(module, entity)])
+        mart = operator.attrgetter(transform)(etl)(*frames)
+        if mart_name == "customer_analytics":
+            check_customer_segments(mart)
+        del mart
+    etl.close()
+    print(json.dumps({"peak_mb": peak_rss_mb() - baseline,
+                      "extract_mb": sum(df.memory_usage(deep=True).sum() for df in extracts.values()) / 2 ** 20}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memory used by a full data mart refresh")
+    parser.add_argument("--config", default="config.json", help="Path to configuration file")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help=f"Synthetic sales rows (default: {DEFAULT_ROWS})")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f"Records per synthetic API page (default: {DEFAULT_PAGE_SIZE})")
+    parser.add_argument("--arrow-strings", action="store_true",
+                        help="Infer strings as Arrow arrays, as pandas 3 does, and only report the reduction")
+    parser.add_argument("--worker", choices=["inferred", "typed"], help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.config, args.rows, args.page_size, args.worker == "typed", args.arrow_strings)
+        return
+
+    results = {}
+    for variant in ("inferred", "typed"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--worker", variant, "--config", args.config,
+             "--rows", str(args.rows), "--page-size", str(args.page_size)]
+            + (["--arrow-strings"] if args.arrow_strings else []),
+            check=True, capture_output=True, text=True
+        ).stdout
+        results[variant] = json.loads(output.splitlines()[-1])
+
+    before, after = results["inferred"], results["typed"]
+    print(f"Before (inferred dtypes): peak +{before['peak_mb']:,.0f} MB, extracts {before['extract_mb']:,.0f} MB")
+    print(f"After  (entity schemas):  peak +{after['peak_mb']:,.0f} MB, extracts {after['extract_mb']:,.0f} MB")
+    reduction = before['peak_mb'] / after['peak_mb']
+    print(f"Peak RSS reduction: {reduction:.2f}x (target {TARGET_REDUCTION:.0f}x)")
+    if reduction < TARGET_REDUCTION and not args.arrow_strings:
+        print("FAIL: the typed extracts miss the peak RSS target")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Data Mart Transform Benchmark
+
+Measures the wall time of the sales, service and inventory transforms when
+their marts refresh at the same time, comparing transforms run in the mart
+threads with the transform process pool. Synthetic extracts shaped like the
+module API data are generated in memory and handed to DataMartETL.transform_mart
+from one thread per mart, as refresh_all_marts does. No database or module
+service is needed: the ETL is given the stub connection of benchmark_memory.
+
+Usage:
+    python benchmark_transform.py [--config CONFIG_FILE] [--rows N] [--processes N] [--chunk-rows N]
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from benchmark_memory import StubConnection
+from datamart_etl import DEFAULT_TRANSFORM_CHUNK_ROWS, DataMartETL
+
+DEFAULT_ROWS = 1_000_000
+
+MAKES = [("Honda", "Accord"), ("Toyota", "Camry"), ("Ford", "F-150"), ("Chevrolet", "Silverado"), ("BMW", "X5")]
+STATES = ["CA", "TX", "FL", "NY", "IL", "WA"]
+
+
+def ids(prefix, values):
+    """String ids like the GUIDs the module APIs return"""
+    return pd.array([f"{prefix}-{value:012d}" for value in values], dtype="string[pyarrow]")
+
+
+def dates(rng, rows):
+    return pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365 * 86400, rows), unit="s")
+
+
+def generate_extracts(rows):
+    """Synthetic extracts for the sales, service and inventory marts, keyed by (module, entity)"""
+    rng = np.random.default_rng(42)
+    make_model = rng.integers(0, len(MAKES), rows)
+    sale_price = rng.uniform(18_000, 90_000, rows).round(2)
+    estimated = rng.uniform(0.5, 8, rows * 2)
+    return {
+        ("sales", "sales"): pd.DataFrame({
+            "SaleId": ids("S", range(rows)), "VehicleId": ids("V", rng.integers(0, rows, rows)),
+            "CustomerId": ids("C", rng.integers(0, rows // 2, rows)), "SaleDate": dates(rng, rows),
+            "SalePrice": sale_price, "DealerCost": (sale_price * 0.9).round(2),
+            "SaleType": pd.Categorical(rng.choice(["New", "Used", "CPO"], rows))
+        }),
+        ("inventory", "vehicles"): pd.DataFrame({
+            "VehicleId": ids("V", range(rows)),
+            "Make": pd.Categorical([MAKES[i][0] for i in make_model]),
+            "Model": pd.Categorical([MAKES[i][1] for i in make_model]),
+            "Year": rng.integers(2015, 2026, rows).astype("int16"),
+            "VehicleType": pd.Categorical(rng.choice(["New", "Used"], rows)),
+            "ListPrice": rng.uniform(18_000, 90_000, rows)
+        }),
+        ("crm", "customers"): pd.DataFrame({
+            "CustomerId": ids("C", range(rows // 2)),
+            "State": pd.Categorical(rng.choice(STATES, rows // 2)),
+            "CustomerSource": pd.Categorical(rng.choice(["Web", "Walk-in"], rows // 2))
+        }),
+        ("service", "ServiceOrders"): pd.DataFrame({
+            "ServiceOrderId": ids("O", range(rows * 2)), "VehicleId": ids("V", rng.integers(0, rows, rows * 2)),
+            "TechnicianId": ids("T", rng.integers(0, 200, rows * 2)), "CompletedDate": dates(rng, rows * 2),
+            "LaborHours": estimated * rng.uniform(0.7, 1.3, rows * 2), "EstimatedHours": estimated,
+            "TotalCost": rng.uniform(50, 3000, rows * 2)
+        }),
+        ("service", "TechnicianPerformance"): pd.DataFrame({
+            "TechnicianId": ids("T", range(200)),
+            "Specialization": pd.Categorical(rng.choice(["Engine", "Electrical", "Body"], 200))
+        }),
+        ("inventory", "inventory"): pd.DataFrame({
+            "InventoryId": ids("I", range(rows // 2)), "VehicleId": ids("V", range(rows // 2)),
+            "ReceivedDate": dates(rng, rows // 2)
+        })
+    }
+
+
+# Each mart's transform and the extracts handed to it, as in the refresh methods
+MARTS = [
+    ("sales_analytics", "transform_sales_data", [("sales", "sales"), ("inventory", "vehicles"), ("crm", "customers")]),
+    ("service_analytics", "transform_service_data",
+     [("service", "ServiceOrders"), ("service", "TechnicianPerformance"), ("inventory", "vehicles")]),
+    ("inventory_analytics", "transform_inventory_data", [("inventory", "inventory"), ("inventory", "vehicles")])
+]
+
+
+def time_transforms(etl, extracts):
+    """Seconds to transform every mart, one thread per mart, and the rows produced"""
+    def run(mart):
+        mart_name, transform, mart_extracts = mart
+        return len(etl.transform_mart(mart_name, getattr(etl.transforms, transform),
+                                      [extracts[extract] for extract in mart_extracts], row_wise=True))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(MARTS)) as pool:
+        rows = sum(pool.map(run, MARTS))
+    return time.perf_counter() - start, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data mart transforms on the transform process pool")
+    parser.add_argument("--config", default="config.json", help="Path to configuration file")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help=f"Synthetic sales rows (default: {DEFAULT_ROWS})")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(),
+                        help="Transform processes (default: one per CPU)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_TRANSFORM_CHUNK_ROWS,
+                        help=f"Rows per transform chunk (default: {DEFAULT_TRANSFORM_CHUNK_ROWS})")
+
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    print(f"Generating {args.rows:,} sales rows")
+    extracts = generate_extracts(args.rows)
+
+    config.pop('staging', None)
+    config['transform'] = {"processes": 0}
+    etl = DataMartETL(config=config, connect=StubConnection)
+    try:
+        before, rows = time_transforms(etl, extracts)
+    finally:
+        etl.close()
+
+    config['transform'] = {"processes": args.processes, "chunk_rows": args.chunk_rows, "min_rows": 0}
+    etl = DataMartETL(config=config, connect=StubConnection)
+    try:
+        # Start the workers outside the timing, as a refresh does only once per
+        # run; spawned workers import this script, and so pandas, as they start
+        for future in [etl.transform_pool.submit(os.getpid) for _ in range(args.processes)]:
+            future.result()
+        after, _ = time_transforms(etl, extracts)
+    finally:
+        etl.close()
+
+    print(f"Before (mart threads):              {before:.2f} s for {rows:,} mart rows")
+    print(f"After  (process pool, {args.processes} processes): {after:.2f} s")
+    print(f"Speed-up: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
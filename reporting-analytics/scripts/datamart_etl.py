@@ -4,116 +4,628 @@ ETL Script for Reporting & Analytics Data Mart Population
 
 This script extracts data from various DMS modules, transforms it according to
 the data mart schema definitions, and loads it into the reporting database.
+Marts with a "pipeline" section in the config are built from that declarative
+spec (sources, joins and derived columns) instead of a hand-written transform.
 
 Usage:
-    python datamart_etl.py [--config CONFIG_FILE] [--mart MART_NAME] [--full-refresh]
+    python datamart_etl.py [--config CONFIG_FILE] [--mart MART_NAME] [--full-refresh] [--force]
+                            [--retry]
 
 Options:
     --config CONFIG_FILE    Path to configuration file (default: config.json)
     --mart MART_NAME        Name of specific data mart to refresh (default: all)
     --full-refresh          Perform full refresh instead of incremental
+    --force                 Refresh marts even if their upstream data is unchanged
+    --retry                 Reuse extracts and marts staged by an earlier failed run
+    --log-file LOG_FILE     Path to log file (default: datamart_etl.log)
 """
 
 import argparse
+import functools
+import hashlib
+import io
 import json
 import logging
 import os
+import shutil
 import sys
+import tempfile
+import threading
 import time
-from datetime import datetime, timedelta
-
-import pandas as pd
-import requests
-
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("datamart_etl.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-logger = logging.getLogger("DataMartETL")
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+from lazy_imports import lazy_import
+
+# pandas is loaded on first use so that --help and library imports stay fast;
+# requests and the database drivers are imported when the ETL is created
+pd = lazy_import("pandas")
 
-# Handle potentially missing database dependencies
-try:
-    import psycopg2
-    from psycopg2.extras import execute_values
-except ImportError:
-    logger.error("psycopg2 is required. Please install it with: pip install psycopg2-binary")
-    psycopg2 = None
-
-try:
-    from sqlalchemy import create_engine
-except ImportError:
-    logger.error("sqlalchemy is required. Please install it with: pip install sqlalchemy")
-    create_engine = None
-
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("datamart_etl.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Logging is configured by main(); importing the module has no side effects
 logger = logging.getLogger("DataMartETL")
 
-class DataMartETL:
-    def __init__(self, config_path='config.json'):
-        """Initialize the ETL process"""
-        logger.info("Initializing Data Mart ETL")
+# Extract settings used when config.json has no "extract" section
+DEFAULT_EXTRACT_WORKERS = 8
+DEFAULT_MODULE_CONCURRENCY = 2
+DEFAULT_PAGE_SIZE = 5000
+DEFAULT_EXTRACT_MEMORY_MB = 1024
+DEFAULT_EXTRACT_TIMEOUT = 120
+DEFAULT_CACHE_MEMORY_MB = 512
+# pyarrow's mimalloc pool keeps memory it has freed committed to the
+# process, so the system allocator is used unless config.json names another
+DEFAULT_ARROW_MEMORY_POOL = 'system'
+
+# Minutes the staged extracts and marts of a failed run can be reused by a retry
+DEFAULT_STAGING_MAX_AGE_MINUTES = 120
+
+# Changes re-read before each watermark when config.json has no
+# "change_tracking" section, to catch records committed out of order
+DEFAULT_WATERMARK_OVERLAP_SECONDS = 300
+
+# Marts refreshed at the same time when config.json has no "scheduler" section
+DEFAULT_PARALLEL_MARTS = 4
+
+# Transform settings used when config.json has no "transform" section; with
+# no processes every transform runs in the thread refreshing its mart
+DEFAULT_TRANSFORM_PROCESSES = 0
+DEFAULT_TRANSFORM_CHUNK_ROWS = 250_000
+DEFAULT_TRANSFORM_MIN_ROWS = 100_000
+
+# Load settings used when config.json has no "load" section: "copy" streams
+# rows with COPY FROM STDIN, "to_sql" is the slower DataFrame.to_sql path
+LOAD_METHODS = ('copy', 'to_sql')
+DEFAULT_LOAD_METHOD = 'copy'
+DEFAULT_COPY_CHUNK_ROWS = 20_000
+DEFAULT_LOCK_TIMEOUT_MS = 2000
+DEFAULT_SWAP_RETRIES = 5
+
+# Column types accepted in the "schemas" section of config.json, which
+# declares per (module, entity) the dtypes applied to each extracted page
+SCHEMA_TYPES = ('int', 'float', 'float32', 'bool', 'datetime', 'category', 'string', 'drop')
+
+# Refresh method for each hand-written mart declared under data_marts in
+# config.json; marts with a "pipeline" section are built by MartPipeline
+MART_REFRESHERS = {
+    'sales_analytics': 'refresh_sales_mart',
+    'service_analytics': 'refresh_service_mart',
+    'inventory_analytics': 'refresh_inventory_mart',
+    'customer_analytics': 'refresh_customer_mart'
+}
+
+# Short names accepted by --mart
+MART_ALIASES = {
+    'sales': 'sales_analytics',
+    'service': 'service_analytics',
+    'inventory': 'inventory_analytics',
+    'customer': 'customer_analytics',
+    'financial': 'financial_analytics'
+}
+
+# Refresh bookkeeping, including the timing of each scheduler run
+METADATA_DDL = """
+    CREATE TABLE IF NOT EXISTS marts.data_mart_metadata (
+        mart_name VARCHAR(100) PRIMARY KEY,
+        last_refresh_date TIMESTAMP,
+        record_count INTEGER
+    );
+    ALTER TABLE marts.data_mart_metadata
+        ADD COLUMN IF NOT EXISTS upstream_fingerprint VARCHAR(64),
+        ADD COLUMN IF NOT EXISTS last_status VARCHAR(20),
+        ADD COLUMN IF NOT EXISTS refresh_seconds NUMERIC(12, 3),
+        ADD COLUMN IF NOT EXISTS critical_path TEXT,
+        ADD COLUMN IF NOT EXISTS critical_path_seconds NUMERIC(12, 3),
+        ADD COLUMN IF NOT EXISTS on_critical_path BOOLEAN;
+"""
+
+# High-water marks of the source changes each mart has loaded, per extract
+WATERMARK_DDL = """
+    CREATE TABLE IF NOT EXISTS marts.extract_watermarks (
+        mart_name VARCHAR(100) NOT NULL,
+        module VARCHAR(50) NOT NULL,
+        entity VARCHAR(100) NOT NULL,
+        high_water_mark TIMESTAMP NOT NULL,
+        high_water_id TEXT,
+        updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (mart_name, module, entity)
+    );
+"""
+
+# Per-record ledger of customer activity and the per-customer aggregates
+# maintained from it, so customer_analytics can be refreshed from deltas
+CUSTOMER_STATE_DDL = """
+    CREATE TABLE IF NOT EXISTS marts.customer_activity (
+        source VARCHAR(20) NOT NULL,
+        record_id TEXT NOT NULL,
+        customer_id TEXT NOT NULL,
+        amount DOUBLE PRECISION,
+        activity_date TIMESTAMP,
+        PRIMARY KEY (source, record_id)
+    );
+    CREATE INDEX IF NOT EXISTS customer_activity_customer_idx ON marts.customer_activity (customer_id);
+    CREATE TABLE IF NOT EXISTS marts.customer_activity_state (
+        customer_id TEXT PRIMARY KEY,
+        total_purchases INTEGER NOT NULL,
+        total_spent DOUBLE PRECISION NOT NULL,
+        last_purchase_date TIMESTAMP,
+        total_service_visits INTEGER NOT NULL,
+        total_service_spent DOUBLE PRECISION NOT NULL,
+        last_service_date TIMESTAMP,
+        interaction_count INTEGER NOT NULL,
+        last_interaction_date TIMESTAMP
+    );
+"""
+
+# State columns as they appear in the customer_analytics mart
+CUSTOMER_STATE_COLUMNS = {
+    'customer_id': 'CustomerId',
+    'total_purchases': 'TotalPurchases',
+    'total_spent': 'TotalSpent',
+    'last_purchase_date': 'LastPurchaseDate',
+    'total_service_visits': 'TotalServiceVisits',
+    'total_service_spent': 'TotalServiceSpent',
+    'last_service_date': 'LastServiceDate',
+    'interaction_count': 'InteractionCount',
+    'last_interaction_date': 'LastInteractionDate'
+}
+
+class ExtractMemoryError(RuntimeError):
+    """An extract grew past the configured memory ceiling"""
+
+class ExtractCache:
+    """Per-run cache of extracted DataFrames keyed by (module, entity, changedSince)
+    
+    Each key is fetched once: callers asking for a key that is already being
+    fetched wait for that fetch instead of starting another. Cached frames
+    are shared between marts and must be treated as read-only. When the
+    frames held in memory exceed ``max_memory`` bytes, the least recently
+    used ones are spilled to Parquet files in ``spill_dir`` and read back on
+    the next hit (or dropped and fetched again if Parquet is unavailable).
+    """
+    
+    def __init__(self, max_memory, spill_dir=None):
+        self.max_memory = max_memory
+        self.spill_dir = spill_dir
+        self._owns_spill_dir = spill_dir is None
+        self._frames = OrderedDict()
+        self._sizes = {}
+        self._spilled = {}
+        self._in_flight = {}
+        self._memory = 0
+        self._lock = threading.Lock()
+        self.stats = {'fetched': 0, 'reused': 0, 'spilled': 0}
+    
+    def get(self, key, fetch):
+        """Return the frame for ``key``, calling ``fetch()`` only if no one has yet"""
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                self.stats['reused'] += 1
+                return self._frames[key]
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._in_flight[key] = Future()
+                owner = True
+            else:
+                owner = False
+            spill_path = self._spilled.get(key)
         
-        # Load configuration
-        with open(config_path, 'r', encoding='utf-8') as f:
-            self.config = json.load(f)
+        if not owner:
+            df = future.result()
+            with self._lock:
+                self.stats['reused'] += 1
+            return df
         
-        # Connect to PostgreSQL
-        if psycopg2 is None:
-            raise ImportError("psycopg2 is required for this script")
-        if create_engine is None:
-            raise ImportError("sqlalchemy is required for this script")
-            
-        self.conn = psycopg2.connect(self.config['db_connection'])
-        self.engine = create_engine(self.config['sqlalchemy_connection'])
+        try:
+            if spill_path is not None:
+                df = pd.read_parquet(spill_path)
+                with self._lock:
+                    self.stats['reused'] += 1
+            else:
+                df = fetch()
+                with self._lock:
+                    self.stats['fetched'] += 1
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
         
-        # Initialize API session
-        self.session = requests.Session()
+        self._store(key, df)
+        future.set_result(df)
+        return df
+    
+    def _store(self, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+        to_spill = []
+        with self._lock:
+            del self._in_flight[key]
+            self._frames[key] = df
+            self._sizes[key] = size
+            self._memory += size
+            while self._memory > self.max_memory and len(self._frames) > 1:
+                old_key, old_df = self._frames.popitem(last=False)
+                self._memory -= self._sizes.pop(old_key)
+                to_spill.append((old_key, old_df))
         
-    def close(self):
-        """Close database connections"""
-        if self.conn:
-            self.conn.close()
+        for old_key, old_df in to_spill:
+            self._spill(old_key, old_df)
+    
+    def _spill(self, key, df):
+        if key in self._spilled:
+            return
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="datamart_extracts_")
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"{'_'.join(str(part) for part in key[:2])}_{len(self._spilled)}.parquet")
+        try:
+            df.to_parquet(path, index=False)
+        except (ImportError, ValueError, TypeError, NotImplementedError) as e:
+            logger.warning("Could not spill %s.%s to Parquet, dropping it from the cache: %s", key[0], key[1], str(e))
+            return
+        with self._lock:
+            self._spilled[key] = path
+            self.stats['spilled'] += 1
+        logger.info("Spilled cached extract %s.%s to %s", key[0], key[1], path)
+    
+    def clear(self):
+        """Drop every cached frame and remove the spill files"""
+        with self._lock:
+            self._frames.clear()
+            self._sizes.clear()
+            self._memory = 0
+            spilled = list(self._spilled.values())
+            self._spilled.clear()
+        if self._owns_spill_dir and self.spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+        else:
+            for path in spilled:
+                if os.path.exists(path):
+                    os.remove(path)
+
+class ExtractStaging:
+    """On-disk Parquet copies of extracts and transformed marts, kept between runs
+    
+    An extract is staged under ``root/<module>/<entity>/<changedSince or full>``
+    as one Parquet part per API page, and only becomes visible once every
+    page is written, so an interrupted extract is never taken for a complete
+    one. Transformed marts are staged under ``root/_marts`` by the
+    fingerprint of their inputs. A mart holds (:meth:`hold`) the entries it
+    reads or writes, and :meth:`release` removes them once the mart is loaded
+    and no other mart holds them, so only the entries of failed marts stay
+    on disk. With ``reuse`` on (a retry), entries younger than ``max_age``
+    seconds are read instead of calling the module APIs and repeating the
+    transforms; :meth:`prune` removes expired ones.
+    """
+    
+    def __init__(self, root, max_age, reuse=False):
+        self.root = root
+        self.max_age = max_age
+        self.reuse = reuse
+        self._holders = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+    
+    def _hold_path(self, mart_name, path):
+        with self._lock:
+            self._holders.setdefault(path, set()).add(mart_name)
+    
+    def _extract_dir(self, module, entity, changed_since):
+        since = changed_since.strftime('%Y%m%dT%H%M%S%f') if changed_since else 'full'
+        return os.path.join(self.root, module, entity, since)
+    
+    def _output_path(self, mart_name, fingerprint):
+        return os.path.join(self.root, '_marts', mart_name, f"{fingerprint}.parquet")
+    
+    def _fresh(self, path):
+        return self.reuse and os.path.exists(path) and time.time() - os.path.getmtime(path) < self.max_age
+    
+    @staticmethod
+    def _read_parts(path):
+        # Memory-mapped, so Arrow-backed columns can be used without copying the file
+        parts = sorted(name for name in os.listdir(path) if name.endswith('.parquet'))
+        return [pd.read_parquet(os.path.join(path, part), memory_map=True) for part in parts]
+    
+    def hold(self, mart_name, extracts, changed_since=None):
+        """Keep the staged ``extracts`` of a mart until it is released
         
-    def extract_module_data(self, module, entity, last_extract_time=None):
-        """Extract data from a module API"""
-        logger.info("Extracting %s data from %s module", entity, module)
+        ``changed_since`` maps (module, entity) pairs to the time their
+        extract is limited to, as in :meth:`DataMartETL.extract_many`.
+        """
+        for module, entity in extracts:
+            self._hold_path(mart_name, self._extract_dir(module, entity, (changed_since or {}).get((module, entity))))
+    
+    def load_extract(self, module, entity, changed_since):
+        """The staged extract, or None if there is no complete, fresh one"""
+        path = self._extract_dir(module, entity, changed_since)
+        if not self._fresh(os.path.join(path, '_SUCCESS')):
+            return None
+        return _concat_chunks(self._read_parts(path))
+    
+    def staged_at(self, module, entity, changed_since):
+        """When the extract was staged, in naive UTC like the watermarks, or None if it is not"""
+        marker = os.path.join(self._extract_dir(module, entity, changed_since), '_SUCCESS')
+        if not os.path.exists(marker):
+            return None
+        return datetime.fromtimestamp(os.path.getmtime(marker), timezone.utc).replace(tzinfo=None)
+    
+    def writer(self, module, entity, changed_since):
+        """A :class:`StagingWriter` that stages an extract page by page"""
+        return StagingWriter(self, self._extract_dir(module, entity, changed_since))
+    
+    def load_output(self, mart_name, fingerprint):
+        """The transformed mart staged for these inputs, or None"""
+        path = self._output_path(mart_name, fingerprint)
+        self._hold_path(mart_name, path)
+        if not self._fresh(path):
+            return None
+        return pd.read_parquet(path, memory_map=True)
+    
+    def save_output(self, mart_name, fingerprint, df):
+        """Stage a transformed mart; a mart Parquet cannot hold is only logged"""
+        path = self._output_path(mart_name, fingerprint)
+        self._hold_path(mart_name, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            df.to_parquet(f"{path}.tmp", index=False)
+            os.replace(f"{path}.tmp", path)
+        except (ImportError, ValueError, TypeError, NotImplementedError) as e:
+            logger.warning("Could not stage transformed %s data: %s", mart_name, str(e))
+            if os.path.exists(f"{path}.tmp"):
+                os.remove(f"{path}.tmp")
+    
+    def release(self, mart_name):
+        """Remove the staged entries of a loaded mart that no other mart still holds"""
+        released = []
+        with self._lock:
+            for path, holders in list(self._holders.items()):
+                holders.discard(mart_name)
+                if not holders:
+                    del self._holders[path]
+                    released.append(path)
+        for path in released:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+    
+    def prune(self):
+        """Remove staged extracts and marts older than ``max_age``, and abandoned partial ones"""
+        cutoff = time.time() - self.max_age
+        removed = 0
+        for directory, subdirs, files in os.walk(self.root, topdown=False):
+            if '_SUCCESS' in files or directory.endswith('.tmp'):
+                marker = os.path.join(directory, '_SUCCESS')
+                if os.path.getmtime(marker if os.path.exists(marker) else directory) < cutoff:
+                    shutil.rmtree(directory, ignore_errors=True)
+                    removed += 1
+                continue
+            for name in files:
+                path = os.path.join(directory, name)
+                if name.endswith(('.parquet', '.tmp')) and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+        if removed:
+            logger.info("Removed %d expired staging entries from %s", removed, self.root)
+
+class StagingWriter:
+    """Writes the pages of one extract to a work directory and publishes it when complete"""
+    
+    def __init__(self, staging, path):
+        self.staging = staging
+        self.path = path
+        self.work_dir = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self.parts = 0
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        os.makedirs(self.work_dir)
+    
+    def write(self, chunk):
+        """Stage one page; False if Parquet cannot hold it"""
+        try:
+            chunk.to_parquet(os.path.join(self.work_dir, f"part-{self.parts:05d}.parquet"), index=False)
+        except (ImportError, ValueError, TypeError, NotImplementedError) as e:
+            logger.warning("Could not stage %s, keeping the extract in memory: %s", self.path, str(e))
+            return False
+        self.parts += 1
+        return True
+    
+    def commit(self):
+        """Publish the staged extract and return it, read back from the staged pages"""
+        open(os.path.join(self.work_dir, '_SUCCESS'), 'w').close()
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.rename(self.work_dir, self.path)
+        return _concat_chunks(self.staging._read_parts(self.path))
+    
+    def abort(self):
+        """Discard the work directory, returning the pages written to it so far"""
+        chunks = self.staging._read_parts(self.work_dir) if os.path.isdir(self.work_dir) else []
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        return chunks
+
+def _as_list(value):
+    """Normalise a column name or list of column names from the config to a list"""
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+class MartPipeline:
+    """Declarative data mart built from a ``pipeline`` section in config.json
+    
+    A pipeline lists its ``sources`` (module API extracts), how they are
+    joined and which columns are derived, and is executed the same way for
+    every mart::
+    
+        "pipeline": {
+            "target_table": "financial_analytics",
+            "incremental": false,
+            "sources": [
+                {"name": "invoices", "module": "financial", "entity": "Invoices",
+                 "columns": ["InvoiceDate", "TotalAmount"],
+                 "filter": "TotalAmount > 0",
+                 "period": {"column": "InvoiceDate", "freq": "M", "as": "Period"},
+                 "aggregate": {"group_by": ["Period"],
+                               "metrics": {"InvoicedAmount": ["TotalAmount", "sum"]}}},
+                ...
+            ],
+            "joins": [{"source": "sales", "on": ["Period"], "how": "outer"}],
+            "fill_missing": 0,
+            "derived_columns": {"PeriodYear": "Period.dt.year"}
+        }
+    
+    Each source is cut down before it is joined: only ``columns`` are kept
+    (plus join keys), rows are filtered with a DataFrame.query expression,
+    dates are bucketed into periods and the rows are aggregated. The first
+    source is the base that ``joins`` merge the others into. Derived
+    columns are DataFrame.eval expressions evaluated in order, so later
+    ones may use earlier ones. With ``incremental`` false the sources are
+    always extracted in full, which aggregated marts need.
+    """
+    
+    JOIN_TYPES = ('left', 'right', 'inner', 'outer')
+    
+    def __init__(self, mart_name, spec):
+        self.mart_name = mart_name
+        self.target_table = spec.get('target_table', mart_name)
+        self.incremental = spec.get('incremental', True)
+        self.sources = spec.get('sources') or []
+        self.joins = spec.get('joins', [])
+        self.fill_missing = spec.get('fill_missing')
+        self.derived_columns = spec.get('derived_columns', {})
+        self._validate()
+    
+    def _validate(self):
+        if not self.sources:
+            raise ValueError(f"Pipeline for {self.mart_name} has no sources")
+        names = [source.get('name') for source in self.sources]
+        for source in self.sources:
+            missing = [key for key in ('name', 'module', 'entity') if key not in source]
+            if missing:
+                raise ValueError(f"Pipeline source in {self.mart_name} is missing: {', '.join(missing)}")
+        if len(set(names)) != len(names):
+            raise ValueError(f"Pipeline for {self.mart_name} has duplicate source names")
+        for join in self.joins:
+            if join.get('source') not in names[1:]:
+                raise ValueError(f"Pipeline for {self.mart_name} joins unknown source: {join.get('source')}")
+            if join.get('how', 'left') not in self.JOIN_TYPES:
+                raise ValueError(f"Pipeline for {self.mart_name} has invalid join type: {join.get('how')}")
+            if not join.get('on') and not (join.get('left_on') and join.get('right_on')):
+                raise ValueError(f"Pipeline for {self.mart_name} join with {join['source']} has no keys")
+    
+    @property
+    def extracts(self):
+        """(module, entity) pairs of the sources, in source order"""
+        return [(source['module'], source['entity']) for source in self.sources]
+    
+    def _join_keys(self, name):
+        """Columns of source ``name`` that joins need, so pruning keeps them"""
+        keys = set()
+        for join in self.joins:
+            keys.update(_as_list(join.get('on')))
+            keys.update(_as_list(join.get('right_on' if join['source'] == name else 'left_on')))
+        return keys
+    
+    def _empty_source(self, source):
+        """Correctly typed empty frame for a source whose extract returned no rows"""
+        period = source.get('period')
+        period_column = period.get('as', 'Period') if period else None
+        aggregate = source.get('aggregate')
+        if aggregate:
+            columns = list(aggregate['group_by'])
+            metrics = list(aggregate['metrics'])
+        else:
+            columns = list(source.get('columns', [])) + ([period_column] if period_column else [])
+            metrics = []
+        return pd.DataFrame({
+            **{column: pd.Series(dtype='datetime64[ns]' if column == period_column else 'object')
+               for column in columns},
+            **{metric: pd.Series(dtype='float64') for metric in metrics}
+        })
+    
+    def _prepare_source(self, source, df):
+        """Prune, filter, bucket and aggregate one source frame"""
+        if df.empty:
+            return self._empty_source(source)
+        
+        columns = source.get('columns')
+        if columns is not None:
+            keep = set(columns) | self._join_keys(source['name'])
+            df = df[[column for column in df.columns if column in keep]]
+        
+        if source.get('filter'):
+            df = df.query(source['filter'])
+        
+        period = source.get('period')
+        if period:
+            dates = pd.to_datetime(df[period['column']])
+            df = df.assign(**{period.get('as', 'Period'): dates.dt.to_period(period.get('freq', 'M')).dt.start_time})
+        
+        aggregate = source.get('aggregate')
+        if aggregate:
+            metrics = {name: tuple(metric) for name, metric in aggregate['metrics'].items()}
+            df = df.groupby(aggregate['group_by'], as_index=False, dropna=False).agg(**metrics)
+        return df
+    
+    def transform(self, *frames):
+        """Build the mart from the source frames, given in source order"""
+        logger.info("Transforming %s data", self.mart_name)
         
         try:
-            # Build API URL
-            base_url = self.config['module_apis'][module]
-            url = f"{base_url}/api/reporting/{entity}"
+            prepared = {
+                source['name']: self._prepare_source(source, df)
+                for source, df in zip(self.sources, frames)
+            }
             
-            params = {}
-            if last_extract_time:
-                params['changedSince'] = last_extract_time.isoformat()
+            df = prepared[self.sources[0]['name']]
+            for join in self.joins:
+                df = df.merge(
+                    prepared[join['source']],
+                    how=join.get('how', 'left'),
+                    on=join.get('on'),
+                    left_on=join.get('left_on'),
+                    right_on=join.get('right_on'),
+                    suffixes=('', f"_{join['source']}"),
+                    validate=join.get('validate')
+                )
             
-            # Make API request
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
+            if self.fill_missing is not None:
+                numeric = df.select_dtypes('number').columns
+                df[numeric] = df[numeric].fillna(self.fill_missing)
             
-            # Convert to dataframe
-            data = response.json()
-            df = pd.DataFrame(data)
+            for name, expression in self.derived_columns.items():
+                values = df.eval(expression)
+                if hasattr(values, 'replace') and pd.api.types.is_float_dtype(values):
+                    # Ratios over a zero denominator become missing rather than infinite
+                    values = values.replace([float('inf'), float('-inf')], float('nan'))
+                df[name] = values
             
-            logger.info("Extracted %d records from %s.%s", len(df), module, entity)
             return df
             
         except Exception as e:
-            logger.error("Error extracting data from %s.%s: %s", module, entity, str(e))
+            logger.error("Error transforming %s data: %s", self.mart_name, str(e))
             raise
+
+class TransformContext:
+    """What the stateless mart transforms read: the configuration and entity schemas
+    
+    The sales, service and inventory transforms are methods of this object
+    rather than of DataMartETL, so the transform process pool is handed
+    only this (pickled with the bound method), not the ETL's connections,
+    pools and HTTP session.
+    """
+    
+    def __init__(self, config):
+        self.config = config
+        self.entity_schemas = config.get('schemas', {})
+    
+    def _lookup(self, mart_name, entity, df, key):
+        """Columns of a lookup extract that a mart keeps, from ``lookup_columns`` in config.json
+        
+        Merging only these avoids copying every column of wide dimension
+        extracts into each mart; without a list the whole extract is merged.
+        """
+        columns = self.config['data_marts'].get(mart_name, {}).get('lookup_columns', {}).get(entity)
+        return _select_columns(df, key, columns)
     
     def transform_sales_data(self, sales_df, vehicles_df, customers_df):
         """Transform sales data for the sales analytics data mart"""
@@ -121,8 +633,10 @@ class DataMartETL:
         
         try:
             # Merge sales with vehicle and customer data
-            df = sales_df.merge(vehicles_df, on='VehicleId', how='left')
-            df = df.merge(customers_df, on='CustomerId', how='left')
+            df = _join_lookup(sales_df, self._lookup('sales_analytics', 'vehicles', vehicles_df, 'VehicleId'),
+                              'VehicleId')
+            df = _join_lookup(df, self._lookup('sales_analytics', 'customers', customers_df, 'CustomerId'),
+                              'CustomerId')
             
             # Add date dimensions
             df['SaleDate'] = pd.to_datetime(df['SaleDate'])
@@ -148,8 +662,13 @@ class DataMartETL:
         
         try:
             # Merge service data with technician and vehicle data
-            df = service_df.merge(technicians_df, on='TechnicianId', how='left')
-            df = df.merge(vehicles_df, on='VehicleId', how='left')
+            df = _join_lookup(
+                service_df,
+                self._lookup('service_analytics', 'TechnicianPerformance', technicians_df, 'TechnicianId'),
+                'TechnicianId'
+            )
+            df = _join_lookup(df, self._lookup('service_analytics', 'vehicles', vehicles_df, 'VehicleId'),
+                              'VehicleId')
             
             # Add date dimensions
             df['ServiceDate'] = pd.to_datetime(df['CompletedDate'])
@@ -173,12 +692,14 @@ class DataMartETL:
         
         try:
             # Merge inventory with vehicle data
-            df = inventory_df.merge(vehicles_df, on='VehicleId', how='left')
+            df = _join_lookup(inventory_df, self._lookup('inventory_analytics', 'vehicles', vehicles_df, 'VehicleId'),
+                              'VehicleId')
             
-            # Calculate days in inventory
+            # Calculate days in inventory. This changes with the refresh date,
+            # so the mart sets skip_unchanged to false in config.json
             df['ReceivedDate'] = pd.to_datetime(df['ReceivedDate'])
-            today = datetime.now().date()
-            df['DaysInInventory'] = (today - df['ReceivedDate'].dt.date).dt.days
+            today = pd.Timestamp(datetime.now().date())
+            df['DaysInInventory'] = (today - df['ReceivedDate'].dt.normalize()).dt.days
             
             # Set inventory age buckets
             df['AgeBucket'] = pd.cut(
@@ -193,41 +714,539 @@ class DataMartETL:
         except Exception as e:
             logger.error("Error transforming inventory data: %s", str(e))
             raise
+
+def _smallest_int_dtype(values, nullable):
+    """Narrowest integer dtype that holds every value in ``values``"""
+    low, high = values.min(), values.max()
+    for bits in (8, 16, 32):
+        if -2 ** (bits - 1) <= low and high < 2 ** (bits - 1):
+            return f"Int{bits}" if nullable else f"int{bits}"
+    return "Int64" if nullable else "int64"
+
+def _row_key(record, id_column=None):
+    """Key identifying an API record: its id, or the whole record without one"""
+    if id_column and isinstance(record, dict) and record.get(id_column) is not None:
+        return record[id_column]
+    return json.dumps(record, sort_keys=True, default=str)
+
+def _apply_schema(df, schema):
+    """Convert the columns named in an entity schema to compact dtypes
+    
+    ``schema`` maps column names to one of SCHEMA_TYPES; columns the frame
+    does not have are ignored, undeclared columns keep their inferred dtype
+    and columns declared 'drop', which no mart reads, are removed. Integers
+    are downcast to the narrowest type, using a nullable type when values
+    are missing, and unparseable values become missing.
+    """
+    for column, kind in (schema or {}).items():
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if kind == 'int':
+            values = pd.to_numeric(values, errors='coerce')
+            present = values.dropna()
+            if present.empty or (present % 1 != 0).any():
+                # Not integral after all; keep it as a float
+                values = values.astype('float64')
+            else:
+                values = values.astype(_smallest_int_dtype(present, len(present) < len(values)))
+        elif kind == 'float':
+            values = pd.to_numeric(values, errors='coerce').astype('float64')
+        elif kind == 'float32':
+            values = pd.to_numeric(values, errors='coerce').astype('float32')
+        elif kind == 'bool':
+            values = values.astype('boolean')
+        elif kind == 'datetime':
+            values = pd.to_datetime(values, errors='coerce')
+        elif kind == 'category':
+            values = values.astype('category')
+        elif kind == 'string':
+            values = values.astype('string[pyarrow]')
+        elif kind == 'drop':
+            del df[column]
+            continue
+        else:
+            raise ValueError(f"Unknown type {kind} for column {column}; expected one of {', '.join(SCHEMA_TYPES)}")
+        df[column] = values
+    return df
+
+def _concat_chunks(chunks):
+    """Combine extract pages into one frame, emptying the ``chunks`` list
+    
+    The frame is built a column at a time and each column is taken out of
+    the pages once combined, so the pages and the combined frame are never
+    held in full together. pandas concatenates categoricals with different
+    categories as object columns, so those are combined with
+    union_categoricals instead.
+    """
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks.pop()
+    columns = list(dict.fromkeys(column for chunk in chunks for column in chunk.columns))
+    combined = {}
+    for column in columns:
+        pieces = [
+            chunk.pop(column) if column in chunk.columns else pd.Series(index=chunk.index, dtype='float64')
+            for chunk in chunks
+        ]
+        if all(isinstance(piece.dtype, pd.CategoricalDtype) for piece in pieces):
+            combined[column] = pd.api.types.union_categoricals(pieces)
+        else:
+            combined[column] = pd.concat(pieces, ignore_index=True)
+        del pieces
+    chunks.clear()
+    return pd.DataFrame(combined, copy=False)
+
+def _use_arrow_memory_pool(name):
+    """Have pyarrow allocate from its ``name`` pool ('system', 'jemalloc' or 'mimalloc'), if pyarrow is installed"""
+    try:
+        import pyarrow
+    except ImportError:
+        return
+    pyarrow.set_memory_pool(getattr(pyarrow, f"{name}_memory_pool")())
+
+def _write_handoff(df, path):
+    """Write a frame to an uncompressed Arrow IPC file that transform processes memory-map"""
+    df.reset_index(drop=True).to_feather(path, compression='uncompressed')
+
+def _read_handoff(path, start=None, stop=None):
+    """Frame in a handoff file, or only its rows ``start`` to ``stop``
+    
+    The file is memory-mapped, so a process reading a slice of it only
+    pages in those rows, and processes reading the same file share its
+    pages instead of each holding a copy.
+    """
+    from pyarrow import feather
+    table = feather.read_table(path, memory_map=True)
+    if start is not None:
+        table = table.slice(start, stop - start)
+    return table.to_pandas()
+
+def _run_transform(transform, paths, start, stop, output_path):
+    """Transform process task: apply ``transform`` to the frames handed over in ``paths``
+    
+    Only rows ``start`` to ``stop`` of the first frame are transformed when
+    given. The result is written to ``output_path`` rather than pickled
+    back, and the path is returned.
+    """
+    frames = [_read_handoff(paths[0], start, stop)] + [_read_handoff(path) for path in paths[1:]]
+    _write_handoff(transform(*frames), output_path)
+    return output_path
+
+def _select_columns(df, key, columns):
+    """The join ``key`` and those of ``columns`` present in ``df``, or all of ``df`` without ``columns``"""
+    if columns is None:
+        return df
+    keys = _as_list(key)
+    return df[keys + [column for column in columns if column in df.columns and column not in keys]]
+
+def _join_lookup(facts, lookup, key):
+    """Left join ``lookup`` into ``facts`` on the column ``key``, without copying the fact columns
+    
+    The result is that of ``facts.merge(lookup, on=key, how='left')``,
+    including the ``_x``/``_y`` suffixes of columns both frames have, but
+    it shares the fact columns with ``facts`` and only gathers the lookup
+    columns, where a merge copies every column into a new frame. A lookup
+    with repeated keys, which repeats fact rows, is merged instead.
+    """
+    keys = pd.Index(lookup[key])
+    if not keys.is_unique:
+        return facts.merge(lookup, on=key, how='left')
+    positions = keys.get_indexer(facts[key])
+    del keys
+    
+    overlap = {column for column in lookup.columns if column != key and column in facts.columns}
+    joined = facts.copy(deep=False)
+    joined.index = pd.RangeIndex(len(joined))
+    joined.columns = [f"{column}_x" if column in overlap else column for column in joined.columns]
+    for column in lookup.columns:
+        if column != key:
+            # Rows without a match get the column's missing value, as in a left merge
+            joined[f"{column}_y" if column in overlap else column] = lookup[column].array.take(
+                positions, allow_fill=True
+            )
+    return joined
+
+def _quote_ident(name):
+    """Quote a table or column name for PostgreSQL, keeping its case like to_sql does"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _pg_column_types(df):
+    """PostgreSQL column definitions for a DataFrame, from its dtypes"""
+    types = pd.api.types
+    columns = []
+    for name, dtype in df.dtypes.items():
+        if types.is_bool_dtype(dtype):
+            pg_type = 'BOOLEAN'
+        elif types.is_integer_dtype(dtype):
+            # Unsigned types need the next wider signed type
+            size = dtype.itemsize * (2 if types.is_unsigned_integer_dtype(dtype) else 1)
+            pg_type = 'SMALLINT' if size <= 2 else 'INTEGER' if size <= 4 else 'BIGINT'
+        elif types.is_float_dtype(dtype):
+            pg_type = 'REAL' if dtype.itemsize == 4 else 'DOUBLE PRECISION'
+        elif isinstance(dtype, pd.DatetimeTZDtype):
+            pg_type = 'TIMESTAMPTZ'
+        elif types.is_datetime64_dtype(dtype):
+            pg_type = 'TIMESTAMP'
+        elif types.is_timedelta64_dtype(dtype):
+            pg_type = 'INTERVAL'
+        else:
+            pg_type = 'TEXT'
+        columns.append(f"{_quote_ident(name)} {pg_type}")
+    return columns
+
+def setup_logging(log_file="datamart_etl.log"):
+    """Log to stdout and to ``log_file``"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+class DataMartETL:
+    def __init__(self, config_path='config.json', retry=False, config=None, connect=None, session=None):
+        """Initialize the ETL process
+        
+        ``retry`` reuses data staged by an earlier failed run. ``config`` is
+        used instead of reading ``config_path``, ``connect`` (a function
+        returning a DB-API connection) instead of psycopg2, and ``session``
+        instead of a requests session, so benchmarks can run the ETL without
+        a database or module APIs.
+        """
+        logger.info("Initializing Data Mart ETL")
+        
+        # Load configuration
+        if config is None:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        self.config = config
+        
+        # Connect to PostgreSQL
+        self._engine = None
+        if connect is None:
+            try:
+                import psycopg2
+            except ImportError:
+                raise ImportError("psycopg2 is required. Please install it with: pip install psycopg2-binary") from None
+            try:
+                from sqlalchemy import create_engine
+            except ImportError:
+                raise ImportError("sqlalchemy is required. Please install it with: pip install sqlalchemy") from None
+            connect = lambda: psycopg2.connect(self.config['db_connection'])
+            self._engine = create_engine(self.config['sqlalchemy_connection'])
+            
+        # Marts refresh on several threads, so each thread gets its own
+        # connection (and transaction) from the conn property
+        self._connect = connect
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        
+        # Extracts run on a bounded pool, with a separate limit per module API
+        extract_config = self.config.get('extract', {})
+        self.extract_workers = extract_config.get('max_workers', DEFAULT_EXTRACT_WORKERS)
+        default_limit = extract_config.get('max_concurrent_per_module', DEFAULT_MODULE_CONCURRENCY)
+        module_limits = extract_config.get('module_concurrency', {})
+        self.module_slots = {
+            module: threading.BoundedSemaphore(module_limits.get(module, default_limit))
+            for module in self.config['module_apis']
+        }
+        self.executor = ThreadPoolExecutor(max_workers=self.extract_workers, thread_name_prefix="extract")
+        self.page_size = extract_config.get('page_size', DEFAULT_PAGE_SIZE)
+        self.extract_memory_limit = extract_config.get('max_memory_mb', DEFAULT_EXTRACT_MEMORY_MB) * 1024 * 1024
+        self.extract_timeout = extract_config.get('timeout_seconds', DEFAULT_EXTRACT_TIMEOUT)
+        self.arrow_memory_pool = extract_config.get('arrow_memory_pool', DEFAULT_ARROW_MEMORY_POOL)
+        _use_arrow_memory_pool(self.arrow_memory_pool)
+        self.transforms = TransformContext(self.config)
+        self.entity_schemas = self.transforms.entity_schemas
+        change_tracking = self.config.get('change_tracking', {})
+        self.watermark_overlap = timedelta(
+            seconds=change_tracking.get('overlap_seconds', DEFAULT_WATERMARK_OVERLAP_SECONDS)
+        )
+        self.change_columns = change_tracking.get('entities', {})
+        # Extracts and transformed marts can be staged on disk for retries
+        staging_config = self.config.get('staging', {})
+        self.staging = None
+        if staging_config.get('dir'):
+            self.staging = ExtractStaging(
+                staging_config['dir'],
+                staging_config.get('max_age_minutes', DEFAULT_STAGING_MAX_AGE_MINUTES) * 60,
+                retry
+            )
+        self.extract_cache = ExtractCache(
+            extract_config.get('cache_memory_mb', DEFAULT_CACHE_MEMORY_MB) * 1024 * 1024,
+            extract_config.get('cache_spill_dir')
+        )
+        # Marts are written with COPY unless the config asks for to_sql
+        load_config = self.config.get('load', {})
+        self.load_method = load_config.get('method', DEFAULT_LOAD_METHOD)
+        if self.load_method not in LOAD_METHODS:
+            raise ValueError(f"Unknown load method: {self.load_method}")
+        self.copy_chunk_rows = load_config.get('copy_chunk_rows', DEFAULT_COPY_CHUNK_ROWS)
+        self.lock_timeout_ms = load_config.get('lock_timeout_ms', DEFAULT_LOCK_TIMEOUT_MS)
+        self.swap_retries = load_config.get('swap_retries', DEFAULT_SWAP_RETRIES)
+        # Large transforms can run on a process pool, started on first use
+        transform_config = self.config.get('transform', {})
+        self.transform_processes = transform_config.get('processes', DEFAULT_TRANSFORM_PROCESSES)
+        self.transform_chunk_rows = transform_config.get('chunk_rows', DEFAULT_TRANSFORM_CHUNK_ROWS)
+        self.transform_min_rows = transform_config.get('min_rows', DEFAULT_TRANSFORM_MIN_ROWS)
+        self.handoff_dir = transform_config.get('handoff_dir') or ('/dev/shm' if os.path.isdir('/dev/shm') else None)
+        self._transform_pool = None
+        self._transform_pool_lock = threading.Lock()
+        
+        # Finish loading pandas here: before Python 3.12 a lazy module first
+        # touched by several extract threads at once can be seen half-loaded
+        pd.DataFrame
+        
+        # Initialize API session, with a connection for every extract worker
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=self.extract_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        
+        self._ensure_metadata_table()
+    
+    @property
+    def engine(self):
+        """SQLAlchemy engine for to_sql loads, created on first use with an injected connection"""
+        if self._engine is None:
+            from sqlalchemy import create_engine
+            self._engine = create_engine(self.config['sqlalchemy_connection'])
+        return self._engine
+    
+    @property
+    def conn(self):
+        """PostgreSQL connection of the calling thread, opened on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    @property
+    def transform_pool(self):
+        """Process pool for transforms, started on first use
+        
+        Workers are spawned rather than forked, since forking while extract
+        and mart threads hold locks can leave a child deadlocked.
+        """
+        with self._transform_pool_lock:
+            if self._transform_pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                self._transform_pool = ProcessPoolExecutor(
+                    max_workers=self.transform_processes, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_use_arrow_memory_pool, initargs=(self.arrow_memory_pool,)
+                )
+        return self._transform_pool
+    
+    def close(self):
+        """Close database connections, stop the extract and transform workers and drop the extract cache"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self._transform_pool is not None:
+            self._transform_pool.shutdown(wait=False, cancel_futures=True)
+        self.extract_cache.clear()
+        self.session.close()
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        
+    def iter_module_data(self, module, entity, last_extract_time=None):
+        """Stream data from a module API one page at a time
+        
+        Pages are requested with ``page`` (from 1) and ``pageSize``. A page may
+        be a JSON array, or an object with ``items`` and optionally
+        ``totalCount`` and ``hasMore``. Each page is turned into a DataFrame
+        chunk as soon as it arrives, so only one page of JSON is held at a
+        time. Paging stops at a short or empty page, once ``totalCount`` rows
+        have been read, when ``hasMore`` is false, or when a page starts with
+        the same row as the previous one or has no rows the previous one
+        didn't, as an API that ignores ``page`` returns the same rows each time.
+        """
+        base_url = self.config['module_apis'][module]
+        url = f"{base_url}/api/reporting/{entity}"
+        id_column = self.change_columns.get(module, {}).get(entity, {}).get('id')
+        
+        params = {'pageSize': self.page_size}
+        if last_extract_time:
+            params['changedSince'] = last_extract_time.isoformat()
+        
+        rows_read = 0
+        previous_keys = set()
+        previous_first_key = None
+        page = 1
+        while True:
+            params['page'] = page
+            response = self.session.get(url, params=params, timeout=self.extract_timeout)
+            response.raise_for_status()
+            
+            data = response.json()
+            total_count = None
+            has_more = None
+            if isinstance(data, dict):
+                total_count = data.get('totalCount')
+                has_more = data.get('hasMore')
+                data = data.get('items') or []
+            if not data:
+                return
+            
+            keys = [_row_key(record, id_column) for record in data]
+            if keys[0] == previous_first_key or previous_keys.issuperset(keys):
+                logger.warning("%s.%s page %d repeats rows of page %d; stopping", module, entity, page, page - 1)
+                return
+            
+            chunk = pd.DataFrame.from_records(data)
+            page_rows = len(data)
+            del data, response
+            rows_read += page_rows
+            yield chunk
+            
+            if has_more is not None:
+                if not has_more:
+                    return
+            elif page_rows != self.page_size:
+                return
+            if total_count is not None and rows_read >= total_count:
+                return
+            previous_keys = set(keys)
+            previous_first_key = keys[0]
+            page += 1
+    
+    def extract_module_data(self, module, entity, last_extract_time=None):
+        """Extract data from a module API
+        
+        Pages from :meth:`iter_module_data` are converted to the dtypes of the
+        entity's schema in config.json and combined into one DataFrame.
+        With staging configured each page goes straight to the staging area
+        and the extract is read back from there once complete, so pages are
+        not held in memory meanwhile.
+        If the chunks together grow past the configured memory ceiling, an
+        ExtractMemoryError is raised instead of exhausting the machine.
+        """
+        logger.info("Extracting %s data from %s module", entity, module)
+        
+        writer = None
+        try:
+            schema = self.entity_schemas.get(module, {}).get(entity)
+            if self.staging is not None:
+                writer = self.staging.writer(module, entity, last_extract_time)
+            chunks = []
+            memory = 0
+            records = 0
+            pages = 0
+            for chunk in self.iter_module_data(module, entity, last_extract_time):
+                # Typing each page as it arrives keeps the untyped pages short-lived
+                chunk = _apply_schema(chunk, schema)
+                memory += chunk.memory_usage(deep=True).sum()
+                records += len(chunk)
+                pages += 1
+                if memory > self.extract_memory_limit:
+                    raise ExtractMemoryError(
+                        f"extract exceeded {self.extract_memory_limit // (1024 * 1024)} MB "
+                        f"after {records} records"
+                    )
+                if writer is not None and not writer.write(chunk):
+                    chunks = writer.abort()
+                    writer = None
+                if writer is None:
+                    chunks.append(chunk)
+            
+            if writer is not None:
+                df = writer.commit()
+                writer = None
+            else:
+                df = _concat_chunks(chunks)
+            
+            logger.info("Extracted %d records from %s.%s in %d pages", len(df), module, entity, pages)
+            return df
+            
+        except Exception as e:
+            if writer is not None:
+                writer.abort()
+            logger.error("Error extracting data from %s.%s: %s", module, entity, str(e))
+            raise
+    
+    def _extract_with_limit(self, module, entity, last_extract_time):
+        """Extract on a worker thread through the run's extract cache
+        
+        On a retry, a complete extract staged by the failed run is reused. One of the
+        module's concurrency slots is held only while the API is actually
+        being called.
+        """
+        def fetch():
+            if self.staging is not None:
+                df = self.staging.load_extract(module, entity, last_extract_time)
+                if df is not None:
+                    logger.info("Using staged %s.%s extract (%d records)", module, entity, len(df))
+                    return df
+            with self.module_slots[module]:
+                return self.extract_module_data(module, entity, last_extract_time)
+        
+        changed_since = last_extract_time.isoformat() if last_extract_time else None
+        return self.extract_cache.get((module, entity, changed_since), fetch)
     
-    def transform_customer_data(self, customers_df, interactions_df, sales_df, service_df):
-        """Transform customer data for the customer analytics data mart"""
+    def extract_many(self, extracts, changed_since=None):
+        """Extract several (module, entity) pairs concurrently
+        
+        Returns the dataframes in the order of ``extracts``. ``changed_since``
+        maps pairs to the time their extract starts from; pairs not in it are
+        extracted in full. The extracts of a
+        mart succeed or fail together: on the first failure the extracts not
+        yet started are cancelled and the error is raised, so nothing is loaded.
+        """
+        start = time.time()
+        changed_since = changed_since or {}
+        futures = [
+            self.executor.submit(self._extract_with_limit, module, entity, changed_since.get((module, entity)))
+            for module, entity in extracts
+        ]
+        done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in futures:
+            if future in done and future.exception() is not None:
+                for pending in not_done:
+                    pending.cancel()
+                raise future.exception()
+        
+        logger.info("Extracted %d datasets in %.2f seconds", len(extracts), time.time() - start)
+        return [future.result() for future in futures]
+    
+    def transform_customer_data(self, customers_df, interactions_df, sales_df, service_df, incremental=False):
+        """Transform customer data for the customer analytics data mart
+        
+        Purchases, service visits and interactions are first merged into the
+        persisted per-customer state (see :meth:`_update_customer_state`), so
+        with ``incremental`` set the activity frames only need the records
+        changed since the last refresh. The mart is then built from the full
+        customer list and that state, and segments are cut from it.
+        """
         logger.info("Transforming customer data")
         
         try:
+            # Customer activity as (source, record, customer, amount, date)
+            # rows, one frame per source, as concatenating them would copy
+            # every id column once more
+            activity = [
+                self._customer_activity('sale', sales_df, 'SaleId', 'SalePrice', 'SaleDate'),
+                self._customer_activity('service', service_df, 'ServiceOrderId', 'TotalCost', 'CompletedDate'),
+                self._customer_activity('interaction', interactions_df, 'InteractionId', None, 'InteractionDate')
+            ]
+            self._update_customer_state(activity, incremental)
+            state = self._read_customer_state()
+            
             # Start with customer base data
-            df = customers_df.copy()
-            
-            # Calculate customer metrics
-            # Sales count and total spent
-            sales_by_customer = sales_df.groupby('CustomerId').agg({
-                'SaleId': 'count',
-                'SalePrice': 'sum'
-            }).rename(columns={
-                'SaleId': 'TotalPurchases',
-                'SalePrice': 'TotalSpent'
-            }).reset_index()
-            
-            # Service count and total spent
-            service_by_customer = service_df.groupby('CustomerId').agg({
-                'ServiceOrderId': 'count',
-                'TotalCost': 'sum'
-            }).rename(columns={
-                'ServiceOrderId': 'TotalServiceVisits',
-                'TotalCost': 'TotalServiceSpent'
-            }).reset_index()
-            
-            # Interaction count
-            interaction_by_customer = interactions_df.groupby('CustomerId').size().reset_index(name='InteractionCount')
-            
-            # Merge all customer metrics
-            df = df.merge(sales_by_customer, on='CustomerId', how='left')
-            df = df.merge(service_by_customer, on='CustomerId', how='left')
-            df = df.merge(interaction_by_customer, on='CustomerId', how='left')
+            if not state.empty:
+                state['CustomerId'] = state['CustomerId'].astype(customers_df['CustomerId'].dtype)
+            df = customers_df.merge(state, on='CustomerId', how='left')
             
             # Fill NaN values with 0 for numerical columns
             for col in ['TotalPurchases', 'TotalSpent', 'TotalServiceVisits', 'TotalServiceSpent', 'InteractionCount']:
@@ -245,11 +1264,16 @@ class DataMartETL:
                 df['LifetimeValue'] * 0.4
             )
             
-            # Assign segments based on RFM score quantiles
-            df['CustomerSegment'] = pd.qcut(
-                df['RFM_Score'],
-                q=[0, 0.25, 0.5, 0.75, 1],
-                labels=['Low Value', 'Medium Value', 'High Value', 'Premium']
+            # Assign segments based on RFM score quantiles. Cutting percentile
+            # ranks keeps tied scores (such as the many customers without any
+            # activity) in one segment, where qcut fails on repeated edges.
+            # Tied scores share their lowest rank, so customers without any
+            # activity are "Low Value" however many of them there are
+            df['CustomerSegment'] = pd.cut(
+                df['RFM_Score'].rank(method='min', pct=True),
+                bins=[0, 0.25, 0.5, 0.75, 1],
+                labels=['Low Value', 'Medium Value', 'High Value', 'Premium'],
+                include_lowest=True
             )
             
             return df
@@ -258,36 +1282,162 @@ class DataMartETL:
             logger.error("Error transforming customer data: %s", str(e))
             raise
     
-    def load_data_mart(self, df, mart_name, schema_name='marts'):
-        """Load transformed data into a data mart table"""
+    @staticmethod
+    def _customer_activity(source, df, id_column, amount_column, date_column):
+        """Ledger rows for one kind of customer activity
+        
+        The id columns are taken over as they are rather than converted to
+        text: they are only written out as CSV, and the ledger columns they
+        are copied into are text. Records without a customer keep a missing
+        ``customer_id``, so they are never counted as a customer.
+        """
+        if df.empty:
+            return pd.DataFrame(columns=['source', 'record_id', 'customer_id', 'amount', 'activity_date'])
+        return pd.DataFrame({
+            'source': pd.Series(source, index=df.index, dtype='category'),
+            'record_id': df[id_column],
+            'customer_id': df['CustomerId'],
+            'amount': df[amount_column].astype('float64') if amount_column else float('nan'),
+            'activity_date': pd.to_datetime(df[date_column], errors='coerce') if date_column in df.columns else pd.NaT
+        }, copy=False)
+    
+    def _update_customer_state(self, activity, incremental):
+        """Merge activity records into the ledger and recompute the aggregates of the customers they touch
+        
+        Each record replaces its earlier version in marts.customer_activity,
+        so replaying a delta, or a record that changed twice, never counts it
+        twice. Only customers with a changed record, or who owned a changed
+        record before, are recomputed. Without ``incremental`` the ledger is
+        rebuilt from ``activity``, a list of ledger frames. A record without a
+        customer only removes its earlier version. Runs as one transaction.
+        
+        The frames are copied into the delta table as they are; a record that
+        appears more than once is reduced to its last copy by the database,
+        which spares holding a deduplicated copy of every id here.
+        """
+        try:
+            with self.conn.cursor() as cursor:
+                if not incremental:
+                    cursor.execute("TRUNCATE marts.customer_activity, marts.customer_activity_state")
+                cursor.execute(
+                    "CREATE TEMPORARY TABLE customer_activity_delta "
+                    "(LIKE marts.customer_activity INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                cursor.execute("ALTER TABLE customer_activity_delta ALTER COLUMN customer_id DROP NOT NULL")
+            
+            for frame in activity:
+                self._copy_rows(frame, "customer_activity_delta")
+            
+            with self.conn.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TEMPORARY TABLE customer_activity_affected ON COMMIT DROP AS
+                    SELECT customer_id FROM customer_activity_delta WHERE customer_id IS NOT NULL
+                    UNION
+                    SELECT ledger.customer_id FROM marts.customer_activity AS ledger
+                    JOIN customer_activity_delta AS delta USING (source, record_id)
+                """)
+                cursor.execute("""
+                    DELETE FROM marts.customer_activity AS ledger USING customer_activity_delta AS delta
+                    WHERE ledger.source = delta.source AND ledger.record_id = delta.record_id
+                """)
+                cursor.execute("""
+                    INSERT INTO marts.customer_activity (source, record_id, customer_id, amount, activity_date)
+                    SELECT source, record_id, customer_id, amount, activity_date FROM (
+                        -- The delta is only ever appended to, so its physical
+                        -- order is the order the records were copied in
+                        SELECT DISTINCT ON (source, record_id) * FROM customer_activity_delta
+                        ORDER BY source, record_id, ctid DESC
+                    ) AS latest
+                    WHERE customer_id IS NOT NULL
+                """)
+                cursor.execute("""
+                    DELETE FROM marts.customer_activity_state
+                    WHERE customer_id IN (SELECT customer_id FROM customer_activity_affected)
+                """)
+                cursor.execute("""
+                    INSERT INTO marts.customer_activity_state
+                    SELECT customer_id,
+                        COUNT(*) FILTER (WHERE source = 'sale'),
+                        COALESCE(SUM(amount) FILTER (WHERE source = 'sale'), 0),
+                        MAX(activity_date) FILTER (WHERE source = 'sale'),
+                        COUNT(*) FILTER (WHERE source = 'service'),
+                        COALESCE(SUM(amount) FILTER (WHERE source = 'service'), 0),
+                        MAX(activity_date) FILTER (WHERE source = 'service'),
+                        COUNT(*) FILTER (WHERE source = 'interaction'),
+                        MAX(activity_date) FILTER (WHERE source = 'interaction')
+                    FROM marts.customer_activity
+                    WHERE customer_id IN (SELECT customer_id FROM customer_activity_affected)
+                    GROUP BY customer_id
+                """)
+            self.conn.commit()
+            
+            logger.info("Merged %d customer activity records into the customer state",
+                        sum(len(frame) for frame in activity))
+            
+        except Exception:
+            self.conn.rollback()
+            raise
+    
+    def _read_customer_state(self):
+        """Per-customer aggregates from marts.customer_activity_state, with mart column names"""
+        buffer = io.StringIO()
+        with self.conn.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY (SELECT {', '.join(CUSTOMER_STATE_COLUMNS)} FROM marts.customer_activity_state) "
+                "TO STDOUT WITH (FORMAT csv, HEADER)",
+                buffer
+            )
+        self.conn.commit()
+        buffer.seek(0)
+        
+        state = pd.read_csv(buffer, dtype={'customer_id': 'string'},
+                            parse_dates=['last_purchase_date', 'last_service_date', 'last_interaction_date'])
+        return state.rename(columns=CUSTOMER_STATE_COLUMNS)
+    
+    def load_data_mart(self, df, mart_name, schema_name='marts', method=None, primary_key=None, indexes=None):
+        """Load transformed data into a data mart table
+        
+        The rows are written to ``{mart_name}_temp``, which is indexed on
+        ``primary_key`` and each column list in ``indexes`` and analyzed before
+        it replaces the production table, so the first queries after a refresh
+        already have indexes and statistics. ``method`` overrides the
+        configured load method.
+        """
+        method = method or self.load_method
         logger.info("Loading data into %s data mart", mart_name)
         
         try:
             # Write to PostgreSQL
             table_name = f"{schema_name}.{mart_name}"
             
-            # First drop temp table if it exists
+            # First drop temp table if it exists, committed so that to_sql's
+            # own connection is not blocked behind this one
             with self.conn.cursor() as cursor:
                 cursor.execute(f"DROP TABLE IF EXISTS {table_name}_temp")
+            self.conn.commit()
             
             # Write dataframe to temp table
-            df.to_sql(
-                f"{mart_name}_temp",
-                self.engine,
-                schema=schema_name,
-                if_exists='replace',
-                index=False
-            )
+            if method == 'copy':
+                self._copy_to_table(df, f"{table_name}_temp")
+            else:
+                df.to_sql(
+                    f"{mart_name}_temp",
+                    self.engine,
+                    schema=schema_name,
+                    if_exists='replace',
+                    index=False
+                )
             
-            # Replace production table with temp table
+            # Index and analyze the temp table while nothing reads it
             with self.conn.cursor() as cursor:
-                # Drop production table and rename temp
-                cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
-                cursor.execute(f"ALTER TABLE {table_name}_temp RENAME TO {mart_name}")
-            
-            # Commit the transaction
+                for columns in ([primary_key] if primary_key else []) + list(indexes or []):
+                    index_columns = ', '.join(_quote_ident(column) for column in _as_list(columns))
+                    cursor.execute(f"CREATE INDEX ON {table_name}_temp ({index_columns})")
+                cursor.execute(f"ANALYZE {table_name}_temp")
             self.conn.commit()
             
+            self._swap_tables(table_name, mart_name)
+            
             logger.info("Successfully loaded %d records into %s", len(df), mart_name)
             
         except Exception as e:
@@ -295,204 +1445,692 @@ class DataMartETL:
             logger.error("Error loading data into %s: %s", mart_name, str(e))
             raise
     
-    def refresh_sales_mart(self, full_refresh=False):
-        """Refresh the sales analytics data mart"""
-        logger.info("Refreshing sales analytics data mart")
+    def _swap_tables(self, table_name, mart_name):
+        """Replace ``table_name`` with its temp table in a single transaction
         
-        try:
-            # Get last extract time unless doing full refresh
-            last_extract_time = None
-            if not full_refresh:
+        Readers see either the old or the new table, never a missing one. The
+        swap waits at most ``lock_timeout_ms`` for queries still reading the
+        old table, because readers arriving meanwhile queue behind it; when
+        the wait times out the swap is retried after a growing pause.
+        """
+        for attempt in range(self.swap_retries + 1):
+            try:
                 with self.conn.cursor() as cursor:
-                    cursor.execute("SELECT MAX(last_refresh_date) FROM marts.data_mart_metadata WHERE mart_name = 'sales_analytics'")
-                    result = cursor.fetchone()
-                    if result and result[0]:
-                        last_extract_time = result[0]
+                    cursor.execute("SET LOCAL lock_timeout = %s", (f"{self.lock_timeout_ms}ms",))
+                    cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+                    cursor.execute(f"ALTER TABLE {table_name}_temp RENAME TO {mart_name}")
+                self.conn.commit()
+                return
+            except Exception as e:
+                self.conn.rollback()
+                # 55P03 is lock_not_available
+                if getattr(e, 'pgcode', None) != '55P03' or attempt == self.swap_retries:
+                    raise
+                logger.warning("Swapping in %s timed out waiting for readers, retrying", table_name)
+                time.sleep(min(2 ** attempt, 30))
+    
+    def _copy_to_table(self, df, table_name, temporary=False, like=None):
+        """Create ``table_name`` and fill it with COPY FROM STDIN
+        
+        Column types are taken from ``df``, or copied from the existing table
+        ``like``, which has to have every column of ``df``. Rows are sent as
+        CSV in chunks of ``copy_chunk_rows``, so only one chunk is ever held
+        as text. Runs in the calling thread's transaction; a ``temporary``
+        table is dropped when that transaction ends.
+        """
+        with self.conn.cursor() as cursor:
+            definition = f"LIKE {like} INCLUDING DEFAULTS" if like else ', '.join(_pg_column_types(df))
+            if temporary:
+                cursor.execute(f"CREATE TEMPORARY TABLE {table_name} ({definition}) ON COMMIT DROP")
+            else:
+                cursor.execute(f"CREATE TABLE {table_name} ({definition})")
+        self._copy_rows(df, table_name)
+    
+    def _copy_rows(self, df, table_name):
+        """Append the rows of ``df`` to the existing ``table_name`` with COPY FROM STDIN, chunk by chunk"""
+        columns = ', '.join(_quote_ident(name) for name in df.columns)
+        copy_sql = f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        
+        with self.conn.cursor() as cursor:
+            for offset in range(0, len(df), self.copy_chunk_rows):
+                # Encoded, as StringIO holds its text at four bytes a character
+                buffer = io.BytesIO()
+                df.iloc[offset:offset + self.copy_chunk_rows].to_csv(
+                    buffer, index=False, header=False, na_rep='\\N', encoding='utf-8'
+                )
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+    
+    def _table_columns(self, table_name, schema_name='marts'):
+        """Column names of an existing table, in table order"""
+        with self.conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_schema = %s AND table_name = %s ORDER BY ordinal_position",
+                (schema_name, table_name)
+            )
+            columns = [row[0] for row in cursor.fetchall()]
+        self.conn.commit()
+        return columns
+    
+    def upsert_data_mart(self, df, mart_name, primary_key, schema_name='marts'):
+        """Merge changed rows into an existing data mart table on its primary key
+        
+        The rows are staged in a temporary table; in one transaction the mart
+        rows with the same keys are deleted and the staged rows inserted, so
+        readers see either the old or the new version of each row.
+        
+        Returns False, leaving the table untouched, when its columns are not
+        those of ``df`` (after a transform gained or lost a column); the mart
+        then has to be rebuilt with :meth:`load_data_mart`.
+        """
+        # A row changed twice since the last refresh is only staged once
+        df = df.drop_duplicates(subset=primary_key, keep='last')
+        logger.info("Upserting %d changed records into %s data mart", len(df), mart_name)
+        
+        try:
+            table_name = f"{schema_name}.{mart_name}"
+            stage_name = f"{mart_name}_delta"
             
-            # Extract data
-            sales_df = self.extract_module_data('sales', 'sales', last_extract_time)
-            vehicles_df = self.extract_module_data('inventory', 'vehicles', last_extract_time)
-            customers_df = self.extract_module_data('crm', 'customers', last_extract_time)
+            table_columns = self._table_columns(mart_name, schema_name)
+            if set(table_columns) != set(df.columns):
+                logger.warning(
+                    "Columns of %s differ from the transformed data (new: %s, no longer produced: %s)",
+                    table_name, sorted(set(df.columns) - set(table_columns)) or 'none',
+                    sorted(set(table_columns) - set(df.columns)) or 'none'
+                )
+                return False
             
-            # Transform data
-            transformed_df = self.transform_sales_data(sales_df, vehicles_df, customers_df)
+            # Typed like the mart, as a column that is empty in the delta would be inferred as text
+            self._copy_to_table(df, stage_name, temporary=True, like=table_name)
             
-            # Load data mart
-            self.load_data_mart(transformed_df, 'sales_analytics')
+            columns = ', '.join(_quote_ident(column) for column in df.columns)
+            key_match = ' AND '.join(
+                f"target.{_quote_ident(column)} = delta.{_quote_ident(column)}" for column in primary_key
+            )
+            with self.conn.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {table_name} AS target USING {stage_name} AS delta WHERE {key_match}")
+                replaced = cursor.rowcount
+                cursor.execute(f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {stage_name}")
+            self.conn.commit()
             
-            # Update metadata
+            # ANALYZE only samples the table, so this stays cheap on large marts
             with self.conn.cursor() as cursor:
-                cursor.execute("""
-                    INSERT INTO marts.data_mart_metadata (mart_name, last_refresh_date, record_count)
-                    VALUES ('sales_analytics', NOW(), %s)
-                    ON CONFLICT (mart_name) DO UPDATE
-                    SET last_refresh_date = NOW(), record_count = %s
-                """, (len(transformed_df), len(transformed_df)))
+                cursor.execute(f"ANALYZE {table_name}")
             self.conn.commit()
             
+            logger.info("Upserted %s: %d records updated, %d inserted", mart_name, replaced, len(df) - replaced)
+            return True
+            
         except Exception as e:
-            logger.error("Error refreshing sales analytics data mart: %s", str(e))
+            self.conn.rollback()
+            logger.error("Error upserting data into %s: %s", mart_name, str(e))
             raise
     
-    def refresh_service_mart(self, full_refresh=False):
-        """Refresh the service analytics data mart"""
-        logger.info("Refreshing service analytics data mart")
+    def _ensure_metadata_table(self):
+        """Create marts.data_mart_metadata, or add columns missing from an older layout,
+        and the watermark and customer state tables"""
+        with self.conn.cursor() as cursor:
+            cursor.execute(METADATA_DDL)
+            cursor.execute(WATERMARK_DDL)
+            cursor.execute(CUSTOMER_STATE_DDL)
+        self.conn.commit()
+    
+    @staticmethod
+    def _fingerprint(frames):
+        """Content hash of a mart's extracted frames, used to detect unchanged upstream data"""
+        digest = hashlib.sha256()
+        for df in frames:
+            digest.update(repr(list(df.columns)).encode('utf-8'))
+            digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+    
+    def _run_mart(self, mart_name, extracts, transform, full_refresh=False, force=False, target_table=None,
+                  lookups=None, stateful=False, row_wise=False):
+        """Extract, transform and load one mart and record the outcome in the metadata table
+        
+        ``extracts`` lists the (module, entity) pairs handed to ``transform``
+        in order, and the result is loaded into ``target_table`` (default:
+        the mart name). The mart is left as it is when nothing new was
+        extracted or when the extracted data hashes the same as at its last
+        refresh, unless ``force`` is set or the mart sets ``skip_unchanged``
+        to false in config.json, as marts computed from the refresh date
+        (such as days in inventory) must. Returns True if the mart was reloaded.
+        
+        Only marts with a ``primary_key`` in config.json refresh incrementally:
+        the first extract, the mart's fact source, is limited to rows changed
+        since its watermark (see :meth:`_read_watermarks`), the others are
+        extracted in full, and the result is upserted into the existing table.
+        If the table's columns no longer match the transformed data, the mart
+        is rebuilt from full extracts instead. Other marts are always rebuilt
+        from full extracts, since replacing them with a delta would drop every
+        unchanged row.
         
+        A ``stateful`` transform maintains its own aggregates: its extracts
+        other than ``lookups`` (default: all but the first) are limited to
+        changes, it is called with ``incremental`` saying so, and the mart
+        is rebuilt in full from what it returns. It always runs in this
+        process, since it reads and writes its state in the database; other
+        transforms may run on the transform pool (see :meth:`transform_mart`),
+        split into chunks of the first frame when ``row_wise``.
+        """
+        start = time.time()
+        target_table = target_table or mart_name
+        mart_config = self.config['data_marts'].get(mart_name, {})
+        primary_key = _as_list(mart_config.get('primary_key'))
+        skip_unchanged = mart_config.get('skip_unchanged', True)
+        lookups = extracts[1:] if lookups is None else lookups
+        
+        deltas = [extract for extract in extracts if extract not in lookups]
+        
+        # Get the upstream fingerprint, and the watermarks unless doing full refresh
+        changed_since = None
+        last_fingerprint = None
+        # last_refresh_date holds NOW() in the session's time zone, and watermarks are naive UTC
+        with self.conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT last_refresh_date AT TIME ZONE current_setting('TimeZone') AT TIME ZONE 'UTC', "
+                "upstream_fingerprint, to_regclass(%s) IS NOT NULL "
+                "FROM marts.data_mart_metadata WHERE mart_name = %s",
+                (f"marts.{target_table}", mart_name)
+            )
+            result = cursor.fetchone()
+        self.conn.commit()
+        if result:
+            # An upsert needs the table it merges into
+            if not full_refresh and (stateful or primary_key and result[2]):
+                changed_since = self._read_watermarks(mart_name, deltas, result[0])
+            last_fingerprint = result[1]
+        incremental = changed_since is not None
+        
+        # Extract data
+        extract_start = datetime.now(timezone.utc).replace(tzinfo=None)
+        if self.staging is not None:
+            self.staging.hold(mart_name, extracts, changed_since)
+        frames = self.extract_many(extracts, changed_since)
+        fingerprint = self._fingerprint(frames)
+        if self.staging is not None:
+            # A reused extract only holds the changes made before it was staged
+            staged = [self.staging.staged_at(module, entity, (changed_since or {}).get((module, entity)))
+                      for module, entity in deltas]
+            extract_start = min([extract_start] + [when for when in staged if when is not None])
+        watermarks = self._new_watermarks(
+            [(extract, df) for extract, df in zip(extracts, frames) if extract in deltas], extract_start
+        )
+        
+        # A stateful mart also picks up changed lookups, which the fingerprint catches
+        nothing_new = incremental and not stateful and all(
+            df.empty for extract, df in zip(extracts, frames) if extract in deltas
+        )
+        if not force and skip_unchanged and (nothing_new or fingerprint == last_fingerprint):
+            logger.info("Upstream data of %s has not changed, skipping refresh", mart_name)
+            self._record_refresh(mart_name, 'skipped', time.time() - start, watermarks=watermarks)
+            if self.staging is not None:
+                self.staging.release(mart_name)
+            return False
+        
+        # Transform data, unless a run that failed later already did (and
+        # the output depends on the inputs alone)
+        transformed_df = None
+        if self.staging is not None and skip_unchanged:
+            transformed_df = self.staging.load_output(mart_name, fingerprint)
+            if transformed_df is not None:
+                logger.info("Using staged transformed %s data", mart_name)
+        if transformed_df is None:
+            if stateful:
+                transformed_df = transform(*frames, incremental=incremental)
+            else:
+                transformed_df = self.transform_mart(mart_name, transform, frames, row_wise)
+            if self.staging is not None:
+                self.staging.save_output(mart_name, fingerprint, transformed_df)
+        
+        # Load data mart
+        if incremental and not stateful:
+            if not self.upsert_data_mart(transformed_df, target_table, primary_key):
+                # The changes alone cannot fill a table with new columns
+                logger.info("Rebuilding %s from full extracts", mart_name)
+                return self._run_mart(mart_name, extracts, transform, full_refresh=True, force=True,
+                                      target_table=target_table, lookups=lookups, stateful=stateful,
+                                      row_wise=row_wise)
+        else:
+            self.load_data_mart(transformed_df, target_table, primary_key=primary_key,
+                                indexes=mart_config.get('indexes'))
+        
+        # Update metadata
+        self._record_refresh(mart_name, 'refreshed', time.time() - start, len(transformed_df), fingerprint,
+                             watermarks)
+        if self.staging is not None:
+            self.staging.release(mart_name)
+        return True
+    
+    def transform_mart(self, mart_name, transform, frames, row_wise=False):
+        """Run a mart transform, on the transform process pool when configured
+        
+        Transforms whose first frame has at least ``transform.min_rows`` rows
+        run on a pool of ``transform.processes`` processes, so the transforms
+        of marts refreshing at the same time use separate cores. The frames
+        are handed over as Arrow files in ``handoff_dir`` (shared memory
+        under /dev/shm where available) instead of being pickled. A
+        ``row_wise`` transform, which maps each row of its first frame
+        independently, is also split into ``transform.chunk_rows`` chunks
+        of that frame that run side by side, each reading the other frames
+        whole. Frames that cannot be written as Arrow are transformed here.
+        A transform sent to the pool is pickled, so it has to be a function
+        or a method of a small object such as :class:`TransformContext` or
+        :class:`MartPipeline`, not of the ETL itself.
+        """
+        rows = len(frames[0]) if frames else 0
+        if self.transform_processes < 1 or rows < self.transform_min_rows:
+            return transform(*frames)
+        
+        handoff = tempfile.mkdtemp(prefix=f"{mart_name}-", dir=self.handoff_dir)
         try:
-            # Get last extract time unless doing full refresh
-            last_extract_time = None
-            if not full_refresh:
-                with self.conn.cursor() as cursor:
-                    cursor.execute("SELECT MAX(last_refresh_date) FROM marts.data_mart_metadata WHERE mart_name = 'service_analytics'")
-                    result = cursor.fetchone()
-                    if result and result[0]:
-                        last_extract_time = result[0]
+            paths = [os.path.join(handoff, f"input-{i}.arrow") for i in range(len(frames))]
+            try:
+                for df, path in zip(frames, paths):
+                    _write_handoff(df, path)
+            except (ImportError, ValueError, TypeError, NotImplementedError) as e:
+                logger.warning("Could not hand %s data to the transform processes, transforming in-process: %s",
+                               mart_name, str(e))
+                return transform(*frames)
             
-            # Extract data
-            service_df = self.extract_module_data('service', 'ServiceOrders', last_extract_time)
-            technicians_df = self.extract_module_data('service', 'TechnicianPerformance', last_extract_time)
-            vehicles_df = self.extract_module_data('inventory', 'vehicles', last_extract_time)
-            
-            # Transform data
-            transformed_df = self.transform_service_data(service_df, technicians_df, vehicles_df)
+            # Each chunk reads and joins the other frames whole, so chunks
+            # beyond one per process would only repeat that work
+            step = max(self.transform_chunk_rows, -(-rows // self.transform_processes)) if row_wise else rows
+            chunks = [(start, min(start + step, rows)) for start in range(0, rows, step)]
+            futures = [
+                self.transform_pool.submit(_run_transform, transform, paths, start, stop,
+                                           os.path.join(handoff, f"output-{i}.arrow"))
+                for i, (start, stop) in enumerate(chunks)
+            ]
+            try:
+                outputs = [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+            logger.info("Transformed %s data in %d chunks on the transform pool", mart_name, len(chunks))
+            return _concat_chunks([_read_handoff(path) for path in outputs])
+        finally:
+            shutil.rmtree(handoff, ignore_errors=True)
+    
+    def _read_watermarks(self, mart_name, extracts, last_refresh_date):
+        """Start time of each incremental extract of a mart, from marts.extract_watermarks
+        
+        Each extract restarts ``watermark_overlap`` before the newest change
+        the mart has loaded from it, so records committed out of order are
+        still picked up; re-reading a record is harmless because incremental
+        loads replace rows by key. Extracts without a watermark yet start
+        from the mart's last refresh. Returns None, meaning a full refresh,
+        if there is neither.
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT module, entity, high_water_mark FROM marts.extract_watermarks WHERE mart_name = %s",
+                (mart_name,)
+            )
+            marks = {(module, entity): mark for module, entity, mark in cursor.fetchall()}
+        self.conn.commit()
+        
+        changed_since = {}
+        for extract in extracts:
+            mark = marks.get(extract, last_refresh_date)
+            if mark is None:
+                return None
+            changed_since[extract] = mark - self.watermark_overlap
+        return changed_since
+    
+    def _new_watermarks(self, extracted, extract_start):
+        """High-water marks for the extracted (module, entity) frames
+        
+        With change columns configured under change_tracking in config.json
+        the mark is the newest change actually extracted, along with the id
+        of that record, so changes made while the run was going are read
+        again next time. Without them it is the time the extracts started.
+        Extracts that returned nothing keep their current mark. Marks are
+        naive UTC: time-zone aware change columns are converted to UTC, and
+        ``extract_start`` has to be UTC as well.
+        """
+        watermarks = {}
+        for (module, entity), df in extracted:
+            if df.empty:
+                continue
+            tracking = self.change_columns.get(module, {}).get(entity, {})
+            columns = [column for column in _as_list(tracking.get('timestamp')) if column in df.columns]
+            if not columns:
+                watermarks[(module, entity)] = (extract_start, None)
+                continue
             
-            # Load data mart
-            self.load_data_mart(transformed_df, 'service_analytics')
+            # A record's change time is the first of its change columns that is set,
+            # e.g. UpdatedAt and then CreatedAt for records never updated
+            changed = pd.to_datetime(df[columns[0]], errors='coerce')
+            for column in columns[1:]:
+                changed = changed.fillna(pd.to_datetime(df[column], errors='coerce'))
+            if changed.isna().all():
+                watermarks[(module, entity)] = (extract_start, None)
+                continue
+            if changed.dt.tz is not None:
+                changed = changed.dt.tz_convert('UTC').dt.tz_localize(None)
             
-            # Update metadata
-            with self.conn.cursor() as cursor:
+            newest = changed.idxmax()
+            id_column = tracking.get('id')
+            record_id = str(df.at[newest, id_column]) if id_column in df.columns else None
+            watermarks[(module, entity)] = (changed[newest].to_pydatetime(), record_id)
+        return watermarks
+    
+    def _record_refresh(self, mart_name, status, seconds, record_count=None, fingerprint=None, watermarks=None):
+        """Upsert a mart's row in marts.data_mart_metadata after a refresh attempt
+        
+        ``watermarks`` maps (module, entity) pairs to the (timestamp, record id)
+        the mart has now loaded up to; they are saved in the same transaction,
+        and never moved backwards, so a failed run leaves them as they were
+        and is simply replayed.
+        """
+        with self.conn.cursor() as cursor:
+            if status == 'refreshed':
                 cursor.execute("""
-                    INSERT INTO marts.data_mart_metadata (mart_name, last_refresh_date, record_count)
-                    VALUES ('service_analytics', NOW(), %s)
+                    INSERT INTO marts.data_mart_metadata
+                        (mart_name, last_refresh_date, record_count, upstream_fingerprint, last_status, refresh_seconds)
+                    VALUES (%s, NOW(), %s, %s, %s, %s)
                     ON CONFLICT (mart_name) DO UPDATE
-                    SET last_refresh_date = NOW(), record_count = %s
-                """, (len(transformed_df), len(transformed_df)))
-            self.conn.commit()
+                    SET last_refresh_date = NOW(), record_count = EXCLUDED.record_count,
+                        upstream_fingerprint = EXCLUDED.upstream_fingerprint,
+                        last_status = EXCLUDED.last_status, refresh_seconds = EXCLUDED.refresh_seconds
+                """, (mart_name, record_count, fingerprint, status, seconds))
+            else:
+                cursor.execute("""
+                    INSERT INTO marts.data_mart_metadata (mart_name, last_status, refresh_seconds)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (mart_name) DO UPDATE
+                    SET last_status = EXCLUDED.last_status, refresh_seconds = EXCLUDED.refresh_seconds
+                """, (mart_name, status, seconds))
+            for (module, entity), (mark, record_id) in (watermarks or {}).items():
+                cursor.execute("""
+                    INSERT INTO marts.extract_watermarks (mart_name, module, entity, high_water_mark, high_water_id)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON CONFLICT (mart_name, module, entity) DO UPDATE
+                    SET high_water_mark = EXCLUDED.high_water_mark, high_water_id = EXCLUDED.high_water_id,
+                        updated_at = NOW()
+                    WHERE extract_watermarks.high_water_mark <= EXCLUDED.high_water_mark
+                """, (mart_name, module, entity, mark, record_id))
+        self.conn.commit()
+    
+    def refresh_sales_mart(self, full_refresh=False, force=False):
+        """Refresh the sales analytics data mart"""
+        logger.info("Refreshing sales analytics data mart")
+        
+        try:
+            return self._run_mart('sales_analytics', [
+                ('sales', 'sales'),
+                ('inventory', 'vehicles'),
+                ('crm', 'customers')
+            ], self.transforms.transform_sales_data, full_refresh, force, row_wise=True)
+            
+        except Exception as e:
+            logger.error("Error refreshing sales analytics data mart: %s", str(e))
+            raise
+    
+    def refresh_service_mart(self, full_refresh=False, force=False):
+        """Refresh the service analytics data mart"""
+        logger.info("Refreshing service analytics data mart")
+        
+        try:
+            return self._run_mart('service_analytics', [
+                ('service', 'ServiceOrders'),
+                ('service', 'TechnicianPerformance'),
+                ('inventory', 'vehicles')
+            ], self.transforms.transform_service_data, full_refresh, force, row_wise=True)
             
         except Exception as e:
             logger.error("Error refreshing service analytics data mart: %s", str(e))
             raise
     
-    def refresh_inventory_mart(self, full_refresh=False):
+    def refresh_inventory_mart(self, full_refresh=False, force=False):
         """Refresh the inventory analytics data mart"""
         logger.info("Refreshing inventory analytics data mart")
         
         try:
-            # Get last extract time unless doing full refresh
-            last_extract_time = None
-            if not full_refresh:
-                with self.conn.cursor() as cursor:
-                    cursor.execute("SELECT MAX(last_refresh_date) FROM marts.data_mart_metadata WHERE mart_name = 'inventory_analytics'")
-                    result = cursor.fetchone()
-                    if result and result[0]:
-                        last_extract_time = result[0]
-            
-            # Extract data
-            inventory_df = self.extract_module_data('inventory', 'inventory', last_extract_time)
-            vehicles_df = self.extract_module_data('inventory', 'vehicles', last_extract_time)
-            
-            # Transform data
-            transformed_df = self.transform_inventory_data(inventory_df, vehicles_df)
-            
-            # Load data mart
-            self.load_data_mart(transformed_df, 'inventory_analytics')
-            
-            # Update metadata
-            with self.conn.cursor() as cursor:
-                cursor.execute("""
-                    INSERT INTO marts.data_mart_metadata (mart_name, last_refresh_date, record_count)
-                    VALUES ('inventory_analytics', NOW(), %s)
-                    ON CONFLICT (mart_name) DO UPDATE
-                    SET last_refresh_date = NOW(), record_count = %s
-                """, (len(transformed_df), len(transformed_df)))
-            self.conn.commit()
+            return self._run_mart('inventory_analytics', [
+                ('inventory', 'inventory'),
+                ('inventory', 'vehicles')
+            ], self.transforms.transform_inventory_data, full_refresh, force, row_wise=True)
             
         except Exception as e:
             logger.error("Error refreshing inventory analytics data mart: %s", str(e))
             raise
     
-    def refresh_customer_mart(self, full_refresh=False):
+    def refresh_customer_mart(self, full_refresh=False, force=False):
         """Refresh the customer analytics data mart"""
         logger.info("Refreshing customer analytics data mart")
         
         try:
-            # Get last extract time unless doing full refresh
-            last_extract_time = None
-            if not full_refresh:
-                with self.conn.cursor() as cursor:
-                    cursor.execute("SELECT MAX(last_refresh_date) FROM marts.data_mart_metadata WHERE mart_name = 'customer_analytics'")
-                    result = cursor.fetchone()
-                    if result and result[0]:
-                        last_extract_time = result[0]
-            
-            # Extract data
-            customers_df = self.extract_module_data('crm', 'customers', last_extract_time)
-            interactions_df = self.extract_module_data('crm', 'CustomerInteractions', last_extract_time)
-            sales_df = self.extract_module_data('sales', 'sales', last_extract_time)
-            service_df = self.extract_module_data('service', 'ServiceOrders', last_extract_time)
-            
-            # Transform data
-            transformed_df = self.transform_customer_data(customers_df, interactions_df, sales_df, service_df)
-            
-            # Load data mart
-            self.load_data_mart(transformed_df, 'customer_analytics')
-            
-            # Update metadata
+            # The customer state has to be built from full extracts once
             with self.conn.cursor() as cursor:
-                cursor.execute("""
-                    INSERT INTO marts.data_mart_metadata (mart_name, last_refresh_date, record_count)
-                    VALUES ('customer_analytics', NOW(), %s)
-                    ON CONFLICT (mart_name) DO UPDATE
-                    SET last_refresh_date = NOW(), record_count = %s
-                """, (len(transformed_df), len(transformed_df)))
+                cursor.execute("SELECT EXISTS (SELECT 1 FROM marts.customer_activity_state)")
+                state_ready = cursor.fetchone()[0]
             self.conn.commit()
             
+            return self._run_mart('customer_analytics', [
+                ('crm', 'customers'),
+                ('crm', 'CustomerInteractions'),
+                ('sales', 'sales'),
+                ('service', 'ServiceOrders')
+            ], self.transform_customer_data, full_refresh or not state_ready, force,
+                lookups=[('crm', 'customers')], stateful=True)
+            
         except Exception as e:
             logger.error("Error refreshing customer analytics data mart: %s", str(e))
             raise
     
-    def refresh_all_marts(self, full_refresh=False):
-        """Refresh all data marts"""
-        refresh_type = 'full' if full_refresh else 'incremental'
-        logger.info("Starting %s refresh of all data marts", refresh_type)
+    def refresh_configured_mart(self, mart_name, full_refresh=False, force=False):
+        """Refresh a mart defined by a ``pipeline`` section in config.json"""
+        logger.info("Refreshing %s data mart", mart_name)
         
         try:
-            self.refresh_sales_mart(full_refresh)
-            self.refresh_service_mart(full_refresh)
-            self.refresh_inventory_mart(full_refresh)
-            self.refresh_customer_mart(full_refresh)
-            logger.info("All data marts refreshed successfully")
+            pipeline = MartPipeline(mart_name, self.config['data_marts'][mart_name]['pipeline'])
+            return self._run_mart(mart_name, pipeline.extracts, pipeline.transform,
+                                  full_refresh or not pipeline.incremental, force, pipeline.target_table)
             
         except Exception as e:
-            logger.error("Error refreshing data marts: %s", str(e))
+            logger.error("Error refreshing %s data mart: %s", mart_name, str(e))
             raise
+    
+    def build_refresh_plan(self, marts=None):
+        """Build the mart dependency graph from ``data_marts`` in config.json
+        
+        Returns {mart: set of upstream marts}. A dependency naming another
+        mart orders the two marts; one naming a module API just says where
+        the mart's data comes from. With ``marts``, only those marts and the
+        marts they depend on are planned. Unknown dependencies and cycles
+        raise ValueError.
+        """
+        mart_config = self.config.get('data_marts', {})
+        modules = self.config['module_apis']
+        
+        graph = {}
+        for mart_name, settings in mart_config.items():
+            upstream = set()
+            for dependency in settings.get('dependencies', []):
+                if dependency in mart_config:
+                    upstream.add(dependency)
+                elif dependency not in modules:
+                    raise ValueError(f"Data mart {mart_name} depends on unknown mart or module: {dependency}")
+            if 'pipeline' in settings:
+                for module, _ in MartPipeline(mart_name, settings['pipeline']).extracts:
+                    if module not in modules:
+                        raise ValueError(f"Data mart {mart_name} extracts from unknown module: {module}")
+            graph[mart_name] = upstream
+        
+        if marts is not None:
+            unknown = [mart_name for mart_name in marts if mart_name not in graph]
+            if unknown:
+                raise ValueError(f"Unknown data mart: {', '.join(unknown)}")
+            selected = set()
+            pending = list(marts)
+            while pending:
+                mart_name = pending.pop()
+                if mart_name not in selected:
+                    selected.add(mart_name)
+                    pending.extend(graph[mart_name])
+            graph = {mart_name: graph[mart_name] for mart_name in graph if mart_name in selected}
+        
+        # Kahn's algorithm, only to reject cycles before anything runs
+        remaining = {mart_name: set(upstream) for mart_name, upstream in graph.items()}
+        while remaining:
+            ready = [mart_name for mart_name, upstream in remaining.items() if not upstream]
+            if not ready:
+                raise ValueError(f"Data mart dependencies form a cycle: {', '.join(sorted(remaining))}")
+            for mart_name in ready:
+                del remaining[mart_name]
+            for upstream in remaining.values():
+                upstream.difference_update(ready)
+        
+        return graph
+    
+    def refresh_all_marts(self, full_refresh=False, marts=None, force=False):
+        """Refresh data marts in dependency order, running independent marts in parallel
+        
+        Every mart whose upstream marts are done is started on a pool of
+        ``scheduler.max_parallel_marts`` threads; the extracts of all running
+        marts share the extract pool and cache, and their transforms the
+        transform process pool when one is configured. A failed mart blocks the
+        marts downstream of it, while unrelated marts carry on. The run's
+        critical path (the slowest chain of dependent marts) is written to
+        marts.data_mart_metadata.
+        """
+        refresh_type = 'full' if full_refresh else 'incremental'
+        logger.info("Starting %s refresh of %s", refresh_type, ', '.join(marts) if marts else "all data marts")
+        
+        graph = self.build_refresh_plan(marts)
+        max_parallel = self.config.get('scheduler', {}).get('max_parallel_marts', DEFAULT_PARALLEL_MARTS)
+        run_start = time.time()
+        timings = {}
+        failed = {}
+        done = set()
+        
+        def run(mart_name):
+            if mart_name in MART_REFRESHERS:
+                refresh = getattr(self, MART_REFRESHERS[mart_name])
+            elif 'pipeline' in self.config['data_marts'][mart_name]:
+                refresh = functools.partial(self.refresh_configured_mart, mart_name)
+            else:
+                logger.warning("No refresh is implemented for data mart %s, skipping it", mart_name)
+                return
+            start = time.time()
+            try:
+                refresh(full_refresh, force)
+            finally:
+                timings[mart_name] = (start - run_start, time.time() - run_start)
+        
+        with ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="mart") as pool:
+            running = {}
+            while len(done) + len(failed) < len(graph):
+                for mart_name, upstream in graph.items():
+                    if mart_name in done or mart_name in failed or mart_name in running.values():
+                        continue
+                    blocked_by = upstream & set(failed)
+                    if blocked_by:
+                        failed[mart_name] = f"upstream mart failed: {', '.join(sorted(blocked_by))}"
+                        logger.error("Skipping %s: %s", mart_name, failed[mart_name])
+                    elif upstream <= done:
+                        running[pool.submit(run, mart_name)] = mart_name
+                
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    mart_name = running.pop(future)
+                    if future.exception() is None:
+                        done.add(mart_name)
+                    else:
+                        failed[mart_name] = str(future.exception())
+        
+        critical_path, critical_seconds = self._critical_path(graph, timings)
+        logger.info("Refresh took %.2f seconds; critical path %s (%.2f seconds)",
+                    time.time() - run_start, ' -> '.join(critical_path), critical_seconds)
+        self._record_critical_path(timings, critical_path, critical_seconds)
+        logger.info("Extract cache: %(fetched)d datasets fetched, %(reused)d reused, %(spilled)d spilled",
+                    self.extract_cache.stats)
+        
+        # Loaded marts released their staged data; what failed marts staged is kept for a retry
+        if self.staging is not None:
+            self.staging.prune()
+        
+        if failed:
+            for mart_name, reason in failed.items():
+                logger.error("Data mart %s failed: %s", mart_name, reason)
+            raise RuntimeError(f"{len(failed)} of {len(graph)} data marts failed: {', '.join(sorted(failed))}")
+        logger.info("All data marts refreshed successfully")
+    
+    @staticmethod
+    def _critical_path(graph, timings):
+        """Return the chain of dependent marts with the longest total run time, and that time"""
+        path_seconds = {}
+        previous = {}
+        
+        def longest(mart_name):
+            if mart_name not in path_seconds:
+                start, end = timings.get(mart_name, (0.0, 0.0))
+                best_upstream = max(graph[mart_name], key=longest, default=None)
+                previous[mart_name] = best_upstream
+                path_seconds[mart_name] = (end - start) + (path_seconds[best_upstream] if best_upstream else 0.0)
+            return path_seconds[mart_name]
+        
+        if not graph:
+            return [], 0.0
+        last = max(graph, key=longest)
+        path = []
+        while last is not None:
+            path.append(last)
+            last = previous[last]
+        return path[::-1], path_seconds[path[0]]
+    
+    def _record_critical_path(self, timings, critical_path, critical_seconds):
+        """Store the run's critical path on the metadata rows of every mart that ran"""
+        if not timings:
+            return
+        try:
+            with self.conn.cursor() as cursor:
+                for mart_name in timings:
+                    cursor.execute("""
+                        INSERT INTO marts.data_mart_metadata (mart_name, critical_path, critical_path_seconds, on_critical_path)
+                        VALUES (%s, %s, %s, %s)
+                        ON CONFLICT (mart_name) DO UPDATE
+                        SET critical_path = EXCLUDED.critical_path,
+                            critical_path_seconds = EXCLUDED.critical_path_seconds,
+                            on_critical_path = EXCLUDED.on_critical_path
+                    """, (mart_name, ' -> '.join(critical_path), critical_seconds, mart_name in critical_path))
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error("Error recording critical path timing: %s", str(e))
 
 def main():
     """Main entry point for the ETL script"""
     parser = argparse.ArgumentParser(description="Data Mart ETL Process")
     parser.add_argument("--config", default="config.json", help="Path to configuration file")
-    parser.add_argument("--mart", default=None, help="Specific data mart to refresh")
+    parser.add_argument("--mart", default=None,
+                        help="Specific data mart to refresh, with the marts it depends on (e.g. sales or sales_analytics)")
     parser.add_argument("--full-refresh", action="store_true", help="Perform full refresh instead of incremental")
+    parser.add_argument("--force", action="store_true", help="Refresh marts even if their upstream data is unchanged")
+    parser.add_argument("--retry", action="store_true",
+                        help="Reuse extracts and marts staged by an earlier failed run")
+    parser.add_argument("--log-file", default="datamart_etl.log", help="Path to log file")
     
     args = parser.parse_args()
+    setup_logging(args.log_file)
     
     try:
-        etl = DataMartETL(args.config)
+        etl = DataMartETL(args.config, retry=args.retry)
         
         if args.mart:
-            if args.mart == 'sales':
-                etl.refresh_sales_mart(args.full_refresh)
-            elif args.mart == 'service':
-                etl.refresh_service_mart(args.full_refresh)
-            elif args.mart == 'inventory':
-                etl.refresh_inventory_mart(args.full_refresh)
-            elif args.mart == 'customer':
-                etl.refresh_customer_mart(args.full_refresh)
-            else:
+            mart_name = MART_ALIASES.get(args.mart, args.mart)
+            if mart_name not in etl.config.get('data_marts', {}):
                 logger.error("Unknown data mart: %s", args.mart)
                 sys.exit(1)
+            etl.refresh_all_marts(args.full_refresh, marts=[mart_name], force=args.force)
         else:
-            etl.refresh_all_marts(args.full_refresh)
+            etl.refresh_all_marts(args.full_refresh, force=args.force)
             
     except ImportError as e:
         logger.error("ETL process failed due to missing dependencies: %s", str(e))
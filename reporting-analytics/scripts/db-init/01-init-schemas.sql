@@ -93,6 +93,55 @@ CREATE TABLE reports.dashboard_widget (
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Refresh bookkeeping for the data marts populated by scripts/datamart_etl.py
+CREATE TABLE IF NOT EXISTS marts.data_mart_metadata (
+    mart_name VARCHAR(100) PRIMARY KEY,
+    last_refresh_date TIMESTAMP,
+    record_count INTEGER,
+    upstream_fingerprint VARCHAR(64),
+    last_status VARCHAR(20),
+    refresh_seconds NUMERIC(12, 3),
+    critical_path TEXT,
+    critical_path_seconds NUMERIC(12, 3),
+    on_critical_path BOOLEAN
+);
+
+-- High-water marks of the source changes each data mart has loaded
+CREATE TABLE IF NOT EXISTS marts.extract_watermarks (
+    mart_name VARCHAR(100) NOT NULL,
+    module VARCHAR(50) NOT NULL,
+    entity VARCHAR(100) NOT NULL,
+    high_water_mark TIMESTAMP NOT NULL,
+    high_water_id TEXT,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (mart_name, module, entity)
+);
+
+-- Customer activity ledger and the per-customer aggregates that
+-- scripts/datamart_etl.py maintains from it for customer_analytics
+CREATE TABLE IF NOT EXISTS marts.customer_activity (
+    source VARCHAR(20) NOT NULL,
+    record_id TEXT NOT NULL,
+    customer_id TEXT NOT NULL,
+    amount DOUBLE PRECISION,
+    activity_date TIMESTAMP,
+    PRIMARY KEY (source, record_id)
+);
+
+CREATE INDEX IF NOT EXISTS customer_activity_customer_idx ON marts.customer_activity (customer_id);
+
+CREATE TABLE IF NOT EXISTS marts.customer_activity_state (
+    customer_id TEXT PRIMARY KEY,
+    total_purchases INTEGER NOT NULL,
+    total_spent DOUBLE PRECISION NOT NULL,
+    last_purchase_date TIMESTAMP,
+    total_service_visits INTEGER NOT NULL,
+    total_service_spent DOUBLE PRECISION NOT NULL,
+    last_service_date TIMESTAMP,
+    interaction_count INTEGER NOT NULL,
+    last_interaction_date TIMESTAMP
+);
+
 -- Sample data mart tables
 CREATE TABLE marts.sales_fact (
     id SERIAL PRIMARY KEY,
@@ -0,0 +1,27 @@
+"""
+Lazy Module Imports
+
+Shared by the reporting scripts, which load pandas and numpy on first use so
+that --help and library imports stay fast.
+"""
+
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """Import a module on first attribute access instead of at import time
+    
+    A module that is already imported is returned as it is.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"{name} is required. Please install it with: pip install {name}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
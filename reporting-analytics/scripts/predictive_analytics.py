@@ -16,6 +16,7 @@ Options:
     --config CONFIG_FILE    Path to configuration file (default: config.json)
     --model MODEL_NAME      Name of specific model to run (default: all)
     --retrain               Force retraining of models instead of using cached versions
+    --log-file LOG_FILE     Path to log file (default: predictive_analytics.log)
 """
 
 import argparse
@@ -26,30 +27,27 @@ import pickle
 import sys
 from datetime import datetime, timedelta
 
-import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score, accuracy_score, precision_score, recall_score
-from sklearn.model_selection import train_test_split
+from lazy_imports import lazy_import
 
-# Import sqlalchemy safely
-try:
-    from sqlalchemy import create_engine
-except ImportError:
-    logging.error("sqlalchemy package is required. Please install it with: pip install sqlalchemy")
-    create_engine = None
+# numpy and pandas are loaded on first use, scikit-learn when a model is
+# trained and sqlalchemy when the engine is created, so --help stays fast
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("predictive_analytics.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Logging is configured by main(); importing the module has no side effects
 logger = logging.getLogger("PredictiveAnalytics")
 
+def setup_logging(log_file="predictive_analytics.log"):
+    """Log to stdout and to ``log_file``"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
 class PredictiveAnalytics:
     def __init__(self, config_path='config.json'):
         """Initialize predictive analytics"""
@@ -60,11 +58,12 @@ class PredictiveAnalytics:
             self.config = json.load(f)
         
         # Connect to PostgreSQL
-        if create_engine is not None:
-            self.engine = create_engine(self.config['sqlalchemy_connection'])
-        else:
+        try:
+            from sqlalchemy import create_engine
+        except ImportError:
             logger.error("Could not create database engine - sqlalchemy not installed")
-            raise ImportError("sqlalchemy is required for this script")
+            raise ImportError("sqlalchemy package is required. Please install it with: pip install sqlalchemy") from None
+        self.engine = create_engine(self.config['sqlalchemy_connection'])
         
         # Create models directory if it doesn't exist
         os.makedirs('models', exist_ok=True)
@@ -125,6 +124,10 @@ class PredictiveAnalytics:
                 return existing_model
         
         try:
+            from sklearn.ensemble import RandomForestRegressor
+            from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+            from sklearn.model_selection import train_test_split
+            
             # Load sales data
             sales_df = self.load_data_from_mart('sales_analytics')
             
@@ -297,6 +300,10 @@ class PredictiveAnalytics:
                 return existing_model
         
         try:
+            from sklearn.ensemble import RandomForestRegressor
+            from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+            from sklearn.model_selection import train_test_split
+            
             # Load sales and inventory data
             sales_df = self.load_data_from_mart('sales_analytics')
             inventory_df = self.load_data_from_mart('inventory_analytics')
@@ -410,6 +417,10 @@ class PredictiveAnalytics:
                 return existing_model
         
         try:
+            from sklearn.ensemble import RandomForestClassifier
+            from sklearn.metrics import accuracy_score, precision_score, recall_score
+            from sklearn.model_selection import train_test_split
+            
             # Load customer data
             customer_df = self.load_data_from_mart('customer_analytics')
             
@@ -520,8 +531,10 @@ def main():
     parser.add_argument("--config", default="config.json", help="Path to configuration file")
     parser.add_argument("--model", default=None, help="Specific model to run (sales, inventory, customer)")
     parser.add_argument("--retrain", action="store_true", help="Force retraining of models")
+    parser.add_argument("--log-file", default="predictive_analytics.log", help="Path to log file")
     
     args = parser.parse_args()
+    setup_logging(args.log_file)
     
     try:
         analytics = PredictiveAnalytics(args.config)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+CLI Startup Time Check
+
+Measures how long the Python CLIs in a scripts directory take to start in a
+fresh interpreter, both for `--help` and for a plain import of the module as
+used by other scripts, and compares the fastest of several runs against each
+startup budget. The fastest run is what the script itself costs; slower runs
+only add noise from whatever else the machine was doing.
+Time spent by the interpreter itself (`python -c pass`) is subtracted, so the
+budgets only cover what the scripts add. Each run happens in an empty
+directory, and the check also fails if a run leaves files there (such as a
+log file created at import time).
+
+The budgets are read from startup_budgets.json in the scripts directory,
+which maps each script's module name to its budget in seconds:
+
+    {"datamart_etl": 0.1, "predictive_analytics": 0.1}
+
+Usage:
+    python check_startup.py SCRIPTS_DIR [--runs N] [--budget-scale FACTOR]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BUDGETS_FILE = "startup_budgets.json"
+
+DEFAULT_RUNS = 7
+
+
+def fastest_run_time(args, runs, scripts_dir):
+    """Shortest wall time of ``python *args`` over ``runs`` runs and the files each run left behind"""
+    timings = []
+    leftovers = set()
+    env = dict(os.environ, PYTHONPATH=scripts_dir)
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as workdir:
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *args], cwd=workdir, env=env, check=True,
+                           stdout=subprocess.DEVNULL)
+            timings.append(time.perf_counter() - start)
+            leftovers.update(os.listdir(workdir))
+    return min(timings), sorted(leftovers)
+
+
+def startup_commands(scripts_dir):
+    """{check name: (python arguments, budget in seconds)} for the scripts in ``scripts_dir``"""
+    with open(os.path.join(scripts_dir, BUDGETS_FILE), 'r', encoding='utf-8') as f:
+        budgets = json.load(f)
+    commands = {}
+    for module, budget in budgets.items():
+        commands[f"{module}.py --help"] = ([os.path.join(scripts_dir, f"{module}.py"), "--help"], budget)
+        commands[f"import {module}"] = (["-c", f"import {module}"], budget)
+    return commands
+
+
+def main():
+    """Main entry point for the startup check"""
+    parser = argparse.ArgumentParser(description="Check CLI startup times against their budgets")
+    parser.add_argument("scripts_dir", help=f"Directory with the scripts and their {BUDGETS_FILE}")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help=f"Runs per command (default: {DEFAULT_RUNS})")
+    parser.add_argument("--budget-scale", type=float, default=1.0,
+                        help="Multiply every budget, e.g. 2 on slow CI machines (default: 1)")
+
+    args = parser.parse_args()
+    scripts_dir = os.path.abspath(args.scripts_dir)
+
+    baseline, _ = fastest_run_time(["-c", "pass"], args.runs, scripts_dir)
+    print(f"Bare interpreter: {baseline * 1000:.0f} ms")
+
+    failed = False
+    for name, (command, budget) in startup_commands(scripts_dir).items():
+        elapsed, leftovers = fastest_run_time(command, args.runs, scripts_dir)
+        overhead = elapsed - baseline
+        budget *= args.budget_scale
+        ok = overhead <= budget and not leftovers
+        failed = failed or not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name}: +{overhead * 1000:.0f} ms (budget {budget * 1000:.0f} ms)")
+        if leftovers:
+            print(f"     created files: {', '.join(leftovers)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()